@@ -1,38 +1,110 @@
-from fastapi import APIRouter
-from fastapi.responses import FileResponse
-import service.gen_genshin_image as gen_genshin_image
-import service.gen_genshin_image_by_artifacter as gen_artifacter_image
-import service.gen_profile_image as gen_profile_image
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import Response, StreamingResponse
+from urllib.parse import quote
+from typing import Optional
+import service.render_service as render_service
+import service.image_cache_service as image_cache_service
+import service.batch_render_service as batch_render_service
 import model.status_model as status_model
+import lib.cache_image as cache_image
+import lib.image_encoder as image_encoder
+import lib.stream_archive as stream_archive
+from lib.request_profiler import ProfilingRoute
+import uuid
+import os
 
 
-router = APIRouter(prefix="/buildimage", tags=["image generator"])
+router = APIRouter(prefix="/buildimage", tags=["image generator"], route_class=ProfilingRoute)
+
+def content_disposition(filename: str) -> str:
+    """ダウンロード時のファイル名を指定するContent-Dispositionヘッダーの値を返却します
+
+    Args:
+        filename (str): ダウンロード時のファイル名
+
+    Returns:
+        str: Content-Dispositionヘッダーの値
+    """
+    content_disposition_filename = quote(filename)
+    if content_disposition_filename != filename:
+        return f"attachment; filename*=utf-8''{content_disposition_filename}"
+    return f'attachment; filename="{filename}"'
+
+
+def image_response(image_bytes: bytes, file_path: str, filename: str) -> Response:
+    """画像のbytesをそのまま返却するResponseを生成します。
+    file_pathは入力から算出したキーのため、ETagとして利用します。
+
+    Args:
+        image_bytes (bytes): 画像のbytes
+        file_path (str): 画像の保存先
+        filename (str): ダウンロード時のファイル名
+
+    Returns:
+        Response: 画像のResponse
+    """
+    key, ext = os.path.splitext(os.path.basename(file_path))
+    return Response(
+        content=image_bytes,
+        media_type=image_encoder.MEDIA_TYPES[ext],
+        headers={
+            "ETag": f'"{key}"',
+            "Content-Disposition": content_disposition(filename),
+        },
+    )
 
 
 @router.post("/genshinstat/{gen_type}/")
-def get_genshin_status_build_image(char_stat: status_model.Character, gen_type:int = 0):
-    filename = f"{char_stat.create_date}_{char_stat.uid}_{char_stat.id}_{char_stat.build_type}_{gen_type}.jpg"
-    file_path = f"build_images/{filename}"
-    char_stat.init_utils()
-    if gen_type == 0:
-        gen_genshin_image.save_image(
-            file_path=file_path,
-            character_status=char_stat,
+async def get_genshin_status_build_image(char_stat: status_model.Character, gen_type:int = 0, profile: Optional[str] = None):
+    encode_profile = image_encoder.get_profile(profile)
+    ext = image_encoder.get_extension(encode_profile, image_encoder.JPEG)
+    filename = batch_render_service.character_filename(char_stat, gen_type, ext)
+    # create_dateが異なっても同じビルドであれば生成済みの画像を返却します
+    file_path = batch_render_service.character_file_path(char_stat, gen_type, encode_profile, ext)
+    image_bytes = await batch_render_service.get_character_image_bytes(char_stat, gen_type, encode_profile)
+    return image_response(image_bytes, file_path, filename)
+
+@router.post("/genshinstat/{gen_type}/batch/")
+async def get_genshin_status_build_images(
+    user_data: status_model.UserData,
+    gen_type: int = 0,
+    profile: Optional[str] = None,
+    build_type: Optional[str] = None,
+    archive: str = stream_archive.ZIP,
+):
+    # すべてのキャラクターのビルド画像を、生成できたものから順にzipかmultipart/mixedで送信します
+    # build_typeはbuild_typeが指定されていないキャラクターに利用します
+    if archive not in stream_archive.MEDIA_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"archive {archive} is not found. ({', '.join(stream_archive.MEDIA_TYPES.keys())})",
         )
-    elif gen_type == 1:
-        gen_artifacter_image.save_image(
-            file_path=file_path,
-            character_status=char_stat,
+    encode_profile = image_encoder.get_profile(profile)
+    # 送信の開始後はエラーを返せないため、先に確認します
+    batch_render_service.check_gen_type(gen_type)
+    images = batch_render_service.iter_user_character_images(
+        user_data, gen_type, encode_profile, build_type)
+    if archive == stream_archive.MULTIPART:
+        boundary = uuid.uuid4().hex
+        return StreamingResponse(
+            stream_archive.multipart_stream(images, boundary),
+            media_type=f"{stream_archive.MEDIA_TYPES[archive]}; boundary={boundary}",
         )
-    return FileResponse(file_path, filename=filename)
+    return StreamingResponse(
+        stream_archive.zip_stream(images),
+        media_type=stream_archive.MEDIA_TYPES[archive],
+        headers={
+            "Content-Disposition": content_disposition(f"{user_data.create_date}_{user_data.uid}_{gen_type}.zip"),
+        },
+    )
 
 @router.post("/profile/")
-def get_genshin_profile_image(user_data: status_model.UserData):
-    filename = f"{user_data.create_date}_{user_data.create_date}_{user_data.uid}.jpg"
-    file_path = f"profile_images/{filename}"
-    gen_profile_image.save_image(
-        file_path=file_path,
-        userdata=user_data,
-    )
+async def get_genshin_profile_image(user_data: status_model.UserData, profile: Optional[str] = None):
+    encode_profile = image_encoder.get_profile(profile)
+    ext = image_encoder.get_extension(encode_profile, image_encoder.JPEG)
+    filename = f"{user_data.create_date}_{user_data.create_date}_{user_data.uid}{ext}"
+    file_path = f"profile_images/{cache_image.render_key(user_data)}_{encode_profile.name}{ext}"
+    image_bytes = await image_cache_service.get_image_bytes(
+        file_path, lambda: render_service.render_profile(user_data, encode_profile))
 
-    return FileResponse(file_path, filename=filename)
\ No newline at end of file
+    return image_response(image_bytes, file_path, filename)
\ No newline at end of file
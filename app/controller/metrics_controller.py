@@ -0,0 +1,74 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+import lib.asset_cache as asset_cache
+import lib.cache_image as cache_image
+import lib.gen_image as gen_image
+import lib.layer_cache as layer_cache
+import lib.metrics as metrics
+import lib.sublayer_executor as sublayer_executor
+import lib.single_flight as single_flight
+from lib.redis_render_cache import REDIS_RENDER_CACHE
+from lib.redis_status_cache import STATUS_CACHE
+import service.render_service as render_service
+
+router = APIRouter(tags=["metrics"])
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+async def __cache_stats() -> dict[str, dict]:
+    caches = {
+        "asset": asset_cache.stats(),
+        "font": gen_image.font_cache_stats(),
+        "glyph": gen_image.glyph_cache_stats(),
+        "render": cache_image.stats(),
+        "render_memory": cache_image.memory_stats(),
+    }
+    for name, stats in layer_cache.stats().items():
+        caches[f"layer:{name}"] = stats
+    if REDIS_RENDER_CACHE is not None:
+        caches["render_redis"] = await REDIS_RENDER_CACHE.stats()
+    return caches
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheusのテキスト形式でメトリクスを返却します。
+    処理時間のヒストグラムは環境変数METRICSが"1"の場合のみ記録されます。
+    RENDER_POOL_TYPEがprocessの場合、画像生成の各段階はワーカープロセスで記録されるため含まれません。
+    """
+    caches = await __cache_stats()
+    hits = [({"cache": k}, v["hits"]) for k, v in caches.items()]
+    misses = [({"cache": k}, v["misses"]) for k, v in caches.items()]
+    ratios = [
+        ({"cache": k}, v["hits"] / (v["hits"] + v["misses"]) if v["hits"] + v["misses"] else 0.0)
+        for k, v in caches.items()
+    ]
+    pool = render_service.RENDER_POOL.stats()
+    executor = sublayer_executor.SUBLAYER_EXECUTOR.stats()
+    flights = single_flight.stats()
+
+    lines = []
+    lines += metrics.expose_samples("genshin_cache_hits_total", "counter", "Cache hits.", hits)
+    lines += metrics.expose_samples("genshin_cache_misses_total", "counter", "Cache misses.", misses)
+    lines += metrics.expose_samples("genshin_cache_hit_ratio", "gauge", "Cache hit ratio since start.", ratios)
+    lines += metrics.expose_samples(
+        "genshin_render_pool_in_flight", "gauge", "Renders running or queued in the render pool.",
+        [({}, pool["in_flight"])])
+    lines += metrics.expose_samples(
+        "genshin_render_pool_rejected_total", "counter", "Renders rejected because the render pool queue was full.",
+        [({}, pool["rejected"])])
+    lines += metrics.expose_samples(
+        "genshin_sublayer_executor_pending", "gauge", "Sublayer tasks waiting or running in the executor.",
+        [({}, executor["pending"])])
+    lines += metrics.expose_samples(
+        "genshin_single_flight_in_flight", "gauge", "Distinct keys currently in flight.",
+        [({"name": k}, v["in_flight"]) for k, v in flights.items()])
+    lines += metrics.expose_samples(
+        "genshin_single_flight_coalesced_total", "counter", "Calls that shared an in-flight result.",
+        [({"name": k}, v["coalesced"]) for k, v in flights.items()])
+    lines += metrics.expose_samples(
+        "genshin_status_cache_errors_total", "counter", "Redis errors in the status cache.",
+        [({}, STATUS_CACHE.errors)])
+    lines += metrics.expose_histograms()
+    return PlainTextResponse("\n".join(lines) + "\n", media_type=CONTENT_TYPE)
@@ -1,20 +1,24 @@
 from fastapi import APIRouter
-from fastapi.responses import FileResponse
-import service.gen_ranking_user_image as gen_ranking_user_image
-import model.status_model as status_model
+from typing import Optional
+import service.render_service as render_service
+import service.image_cache_service as image_cache_service
 import model.ranking_model as ranking_model
+import lib.cache_image as cache_image
+import lib.image_encoder as image_encoder
+from lib.request_profiler import ProfilingRoute
+from controller.image_controller import image_response
 
 
-router = APIRouter(prefix="/rankingimage", tags=["ranking image generator"])
+router = APIRouter(prefix="/rankingimage", tags=["ranking image generator"], route_class=ProfilingRoute)
 
 
 @router.post("/get_user/{gen_type}/")
-def get_ranking_user_image(ranking_data: ranking_model.RankingData, highlight:int=0):
+async def get_ranking_user_image(ranking_data: ranking_model.RankingData, highlight:int=0, profile: Optional[str] = None):
     # 0->hp, 1->atack, 2->defense, 3->critical, 4->mastery, 5->elemental
-    filename = f"{ranking_data.create_date}_{ranking_data.uid}_{ranking_data.character.id}_{ranking_data.character.build_type}_{highlight}.png"
-    file_path = f"ranking_images/{filename}"
-    gen_ranking_user_image.save_image(
-        file_path=file_path,
-        ranking_data=ranking_data,
-    )
-    return FileResponse(file_path, filename=filename)
\ No newline at end of file
+    encode_profile = image_encoder.get_profile(profile)
+    ext = image_encoder.get_extension(encode_profile, image_encoder.PNG)
+    filename = f"{ranking_data.create_date}_{ranking_data.uid}_{ranking_data.character.id}_{ranking_data.character.build_type}_{highlight}{ext}"
+    file_path = f"ranking_images/{cache_image.render_key(ranking_data, highlight)}_{encode_profile.name}{ext}"
+    image_bytes = await image_cache_service.get_image_bytes(
+        file_path, lambda: render_service.render_ranking(ranking_data, encode_profile))
+    return image_response(image_bytes, file_path, filename)
\ No newline at end of file
@@ -3,9 +3,10 @@ import service.status_service as status_service
 import repository.enka_repository as enka_repository
 from aiohttp import client_exceptions
 from fastapi.responses import Response
+from lib.request_profiler import ProfilingRoute
 
 
-router = APIRouter(prefix="/status", tags=["status data"])
+router = APIRouter(prefix="/status", tags=["status data"], route_class=ProfilingRoute)
 
 
 @router.get("/uid/{uid}")
@@ -1,9 +1,18 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from fastapi.responses import Response
 import service.repo_to_json as repo_to_json
 import service.score_calc as score_calc
 import service.character_position_service as chara_position
 import service.enka_image_downloader as enka_image_downloader
+import lib.asset_cache as asset_cache
+import lib.cache_image as cache_image
+import lib.gen_image as gen_image
+import lib.layer_cache as layer_cache
+import lib.sublayer_executor as sublayer_executor
+import lib.single_flight as single_flight
+import lib.request_profiler as request_profiler
+from lib.redis_render_cache import REDIS_RENDER_CACHE
+import service.render_service as render_service
 from model.response_json_model import CharacterPosition
 from repository.util_repository import \
     CHARACTER_DATA_DICT, update_character_model_dict
@@ -15,6 +24,9 @@ router = APIRouter(prefix="/util", tags=["util"])
 async def get_status():
     result = await repo_to_json.updates()
     if result:
+        # 更新された画像を読み込み直すよう、読み込み済みの画像と合成済みのレイヤーを破棄します
+        asset_cache.clear()
+        layer_cache.clear_all()
         return Response(status_code=201)
     else:
         return Response(status_code=204)
@@ -42,8 +54,36 @@ async def update_position(position: CharacterPosition):
 @router.put("/update-image-only")
 async def update_image_only():
     await enka_image_downloader.util_image_update()
+    asset_cache.clear()
+    layer_cache.clear_all()
     return Response(status_code=200)
 
+@router.get("/cache-stats")
+async def get_cache_stats():
+    return {
+        "asset": asset_cache.stats(),
+        "font": gen_image.font_cache_stats(),
+        "glyph": gen_image.glyph_cache_stats(),
+        "layer": layer_cache.stats(),
+        "render_pool": render_service.RENDER_POOL.stats(),
+        "sublayer_executor": sublayer_executor.SUBLAYER_EXECUTOR.stats(),
+        "render": cache_image.stats(),
+        "render_memory": cache_image.memory_stats(),
+        "render_redis": await REDIS_RENDER_CACHE.stats() if REDIS_RENDER_CACHE is not None else None,
+        "single_flight": single_flight.stats(),
+    }
+
+@router.get("/profile/{profile_id}")
+async def get_profile_result(profile_id: str, request: Request):
+    # sampleはcollapsed stacks、cprofileはpstats.Statsで読み込めるファイルを返却します
+    request_profiler.check_token(request)
+    result = request_profiler.get_result(profile_id)
+    return Response(
+        content=result.data,
+        media_type=request_profiler.MEDIA_TYPES[result.mode],
+        headers={"X-Profile-Seconds": f"{result.seconds:.6f}"},
+    )
+
 @router.get("/name-to-id/{name}")
 async def get_name_to_id(name: str):
     update_character_model_dict()
@@ -0,0 +1,54 @@
+"""エンコード設定ごとの処理時間とファイルサイズを計測します。
+サンプルのキャラクターを一度だけ生成し、その画像を各設定でエンコードします。
+
+appディレクトリで実行してください。
+    python encode_benchmark.py [サンプルのjson] [繰り返し回数]
+"""
+import model.status_model as status_model
+import service.gen_genshin_image as gen_genshin_image
+import service.gen_genshin_image_by_artifacter as gen_artifacter_image
+import lib.image_encoder as image_encoder
+import json
+import time
+import sys
+
+GENERATORS = {
+    0: gen_genshin_image,
+    1: gen_artifacter_image,
+}
+
+
+def main(sample_path: str, repeat: int):
+    with open(sample_path, "r", encoding="utf-8") as json_file:
+        characters = json.load(json_file)["characters"]
+
+    for gen_type, generator in GENERATORS.items():
+        images = []
+        for character_json in characters:
+            character_json["build_type"] = "atk"
+            character = status_model.Character(**character_json)
+            images.append(generator.get_character_image(character))
+
+        print(f"========《gen_type: {gen_type} / {len(images)}キャラクター / {repeat}回》========")
+        print(f"{'profile':<10}{'平均時間(ms)':>14}{'平均サイズ(KB)':>16}{'サイズ比':>10}")
+        original_size = None
+        for name, profile in image_encoder.PROFILES.items():
+            total_time = 0
+            total_size = 0
+            for image in images:
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    image_bytes = image_encoder.encode(image, profile, image_encoder.JPEG)
+                    total_time += time.perf_counter() - start
+                total_size += len(image_bytes)
+            avg_time = total_time / (len(images) * repeat) * 1000
+            avg_size = total_size / len(images) / 1024
+            if original_size is None:
+                original_size = avg_size
+            print(f"{name:<10}{avg_time:>14.1f}{avg_size:>16.1f}{avg_size / original_size:>10.2f}")
+
+
+if __name__ == "__main__":
+    sample_path = sys.argv[1] if len(sys.argv) > 1 else "../response_1687156408314.json"
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    main(sample_path, repeat)
@@ -2,6 +2,11 @@ from watchdog.events import PatternMatchingEventHandler, FileSystemEvent
 from watchdog.observers.polling import PollingObserver
 import repository.util_repository as util_repository
 import service.character_position_service as position_service
+import lib.layer_cache as layer_cache
+import lib.asset_cache as asset_cache
+import event.prewarm as prewarm
+import service.render_service as render_service
+import lib.cache_image as cache_image
 import asyncio
 
 
@@ -15,18 +20,37 @@ class FileModifiedHandler(PatternMatchingEventHandler):
     def on_modified(self, event: FileSystemEvent):
         file_name = event.src_path.split("/")[-1]
         self.function_map[file_name]()
+        # 以前のデータで生成した画像を返却しないようにします
+        cache_image.update_data_version()
+        # プロセスワーカーにもデータの更新を通知します
+        render_service.notify_data_update()
         print(f"model update done -> {file_name}")
 
 
+def character_update():
+    util_repository.update_character_model_dict()
+    # キャラ画像や位置が変わるため、読み込み済みの画像と合成済みのレイヤーを破棄します
+    asset_cache.clear()
+    layer_cache.clear_all()
+    prewarm.layer_prewarm_start()
+
+
+def position_update():
+    position_service.position_update()
+    asset_cache.clear()
+    layer_cache.clear_all()
+    prewarm.layer_prewarm_start()
+
+
 def json_update_observation_start():
     observation_files = {
         "artifacts.json": util_repository.update_artfact_model_dict,
         "weapons.json": util_repository.update_weapon_model_dict,
         "namecards.json": util_repository.update_namecard_model_dict,
         "names.json": util_repository.update_namehash_model_dict,
-        "characters.json": util_repository.update_character_model_dict,
+        "characters.json": character_update,
         "statusnames.json": util_repository.update_status_namehash_model_dict,
-        "positions.json": position_service.position_update,
+        "positions.json": position_update,
     }
     dir_path = "data"
     recursive = True  # フォルダだった場合それ以下も探索する
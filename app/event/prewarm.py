@@ -0,0 +1,19 @@
+import service.gen_genshin_image as gen_genshin_image
+import service.gen_genshin_image_by_artifacter as gen_artifacter_image
+import lib.layer_cache as layer_cache
+import threading
+
+
+def prewarm():
+    gen_genshin_image.prewarm_background_cache()
+    gen_artifacter_image.prewarm_background_cache()
+    print("layer prewarm done")
+
+
+def layer_prewarm_start():
+    """レイヤーキャッシュの事前生成をバックグラウンドで開始します。
+    LAYER_CACHE_PREWARMが指定されていない場合は何もしません。
+    """
+    if not layer_cache.PREWARM:
+        return
+    threading.Thread(target=prewarm, name="layer_prewarm", daemon=True).start()
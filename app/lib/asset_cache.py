@@ -0,0 +1,85 @@
+from PIL import Image
+from lib.lru_cache import LRUCache
+import os
+
+MAX_CACHE_BYTES = int(os.getenv("ASSET_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+
+def image_bytes(im: Image.Image) -> int:
+    """画像がメモリ上で占めるおおよそのバイト数を返却します
+
+    Args:
+        im (Image.Image): 画像
+
+    Returns:
+        int: バイト数
+    """
+    return im.width * im.height * len(im.getbands())
+
+
+ASSET_CACHE = LRUCache(max_weight=MAX_CACHE_BYTES, weigher=image_bytes)
+
+
+def __load_image(
+    path: str,
+    size: tuple[int, int],
+    scale: int,
+    mode: str,
+    resize_first: bool,
+) -> Image.Image:
+    im = Image.open(path)
+    if mode is not None and not resize_first:
+        im = im.convert(mode)
+    if size is not None:
+        im = im.resize(size=size)
+    elif scale is not None:
+        im = im.resize(size=(im.size[0] * scale // 100, im.size[1] * scale // 100))
+    if mode is not None and resize_first:
+        im = im.convert(mode)
+    im.load()
+    return im
+
+
+def open_image(
+    path: str,
+    size: tuple[int, int] = None,
+    scale: int = None,
+    mode: str = "RGBA",
+    resize_first: bool = False,
+) -> Image.Image:
+    """デコード済みの画像をキャッシュから取得します。存在しない場合は読み込んでキャッシュします。
+    返却される画像は共有されているため、変更する場合は必ずcopyしてください。
+
+    Args:
+        path (str): 画像のPath
+        size (tuple[int, int], optional): リサイズ後のサイズ. Defaults to None.
+        scale (int, optional): リサイズの倍率(%). sizeが指定されている場合は無視されます. Defaults to None.
+        mode (str, optional): 変換後のモード。Noneの場合は元画像のモードのままです. Defaults to "RGBA".
+        resize_first (bool, optional): モード変換の前にリサイズするか. Defaults to False.
+
+    Returns:
+        Image.Image: 画像
+    """
+    if size is not None:
+        size = tuple(size)
+        scale = None
+    key = (path, size, scale, mode, resize_first)
+    return ASSET_CACHE.get_or_load(
+        key,
+        lambda: __load_image(path, size, scale, mode, resize_first),
+    )
+
+
+def stats() -> dict[str, int]:
+    """キャッシュのヒット数、ミス数などを返却します
+
+    Returns:
+        dict[str, int]: 統計情報
+    """
+    return ASSET_CACHE.stats()
+
+
+def clear():
+    """キャッシュを破棄します。画像が更新された場合に利用します。
+    """
+    ASSET_CACHE.clear()
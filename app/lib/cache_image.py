@@ -1,23 +1,157 @@
-from ordered_set import OrderedSet
+from lib.lru_cache import LRUCache
+from pydantic import BaseModel
+from typing import Any, Optional
+import hashlib
+import json
 import os
 import glob
 
-URL_CACHE = OrderedSet(glob.glob('build_images/*.jpg'))
-MAX_CACHE_SIZE = 1000
+# 生成済み画像をディスク上に保持するバイト数の上限
+MAX_CACHE_BYTES = int(os.getenv("RENDER_CACHE_MAX_BYTES", 1024 * 1024 * 1024))
+# 生成済み画像のbytesをメモリ上に保持するバイト数の上限
+MEMORY_CACHE_BYTES = int(os.getenv("RENDER_MEMORY_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+# "0"の場合は生成した画像をディスクに保存しません
+PERSIST = os.getenv("RENDER_CACHE_PERSIST", "1") == "1"
+CACHE_PATTERNS = [
+    f'{directory}/*{ext}'
+    for directory in ['build_images', 'profile_images', 'ranking_images']
+    for ext in ['.jpg', '.png', '.webp']
+]
+# サーバー側で付与する値や画像に影響しない値はキーに含めません
+EXCLUDE_KEYS = {"create_date", "util", "costume", "name_card", "build_scores", "recommended_build_type"}
+
+
+def __remove_file(file_path: str, _):
+    try:
+        os.remove(file_path)
+    except:
+        pass
+
+
+URL_CACHE = LRUCache(
+    max_weight=MAX_CACHE_BYTES,
+    weigher=lambda size: size,
+    on_evict=__remove_file,
+)
+BYTES_CACHE = LRUCache(max_weight=MEMORY_CACHE_BYTES, weigher=len)
+
+
+def __load_cached_files():
+    file_paths = [p for pattern in CACHE_PATTERNS for p in glob.glob(pattern)]
+    # 古いものから登録し、新しいものが残るようにします
+    for file_path in sorted(file_paths, key=os.path.getmtime):
+        URL_CACHE.put(file_path, os.path.getsize(file_path))
+
+
+# ダウンロードできなかったURLの一覧で、サーバーごとに内容が異なり画像にも影響しないため含めません
+DATA_VERSION_EXCLUDE_FILES = {"exclude_file.json"}
+
+
+def __get_data_version() -> str:
+    # キャラクターデータなどが更新された場合に別のキーになるよう、dataのjsonの内容から算出します
+    # 更新日時はサーバーごとに異なるため利用せず、同じデータであればどのサーバーでも同じ値になるようにします
+    digest = hashlib.sha1()
+    for file_path in sorted(glob.glob("data/*.json")):
+        file_name = os.path.basename(file_path)
+        if file_name in DATA_VERSION_EXCLUDE_FILES:
+            continue
+        with open(file_path, mode="rb") as f:
+            content = f.read()
+        digest.update(f"{file_name}:{len(content)}:".encode())
+        digest.update(content)
+    return digest.hexdigest()
+
+
+if PERSIST:
+    __load_cached_files()
+DATA_VERSION = __get_data_version()
+
+
+def update_data_version():
+    """dataのjsonが更新された際に呼び出し、以前のデータで生成した画像を利用しないようにします。
+    """
+    global DATA_VERSION
+    DATA_VERSION = __get_data_version()
+
+
+def __canonicalize(value: Any, exclude_keys: set[str]) -> Any:
+    if isinstance(value, dict):
+        return {
+            k: __canonicalize(v, exclude_keys)
+            for k, v in value.items() if k not in exclude_keys
+        }
+    if isinstance(value, list):
+        return [__canonicalize(v, exclude_keys) for v in value]
+    return value
+
+
+def render_key(model: BaseModel, gen_type: Optional[int] = None, exclude_keys: set[str] = EXCLUDE_KEYS) -> str:
+    """生成する画像の入力から、同じ画像になる場合に同じ値となるキーを返却します。
+
+    Args:
+        model (BaseModel): 画像生成に利用するデータ
+        gen_type (Optional[int], optional): 生成タイプ. Defaults to None.
+        exclude_keys (set[str], optional): キーに含めない項目名. Defaults to EXCLUDE_KEYS.
+
+    Returns:
+        str: データのハッシュ値
+    """
+    payload = __canonicalize(json.loads(model.json()), exclude_keys)
+    canonical = json.dumps(
+        [type(model).__name__, gen_type, DATA_VERSION, payload],
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
 
 
 def check_cache_exists(file_path: str) -> bool:
-    if file_path in URL_CACHE:
+    if URL_CACHE.get(file_path) is not None:
         return True
     else:
         return False
 
 
 def cache_append(file_path: str):
-    URL_CACHE.add(file_path)
-    if len(URL_CACHE) > MAX_CACHE_SIZE:
-        image_path = URL_CACHE.pop(0)
-        try:
-            os.remove(image_path)
-        except:
-            pass
+    URL_CACHE.put(file_path, os.path.getsize(file_path))
+
+
+def get_bytes(file_path: str) -> Optional[bytes]:
+    """メモリ上にある生成済み画像のbytesを取得します。
+
+    Args:
+        file_path (str): 画像の保存先
+
+    Returns:
+        Optional[bytes]: 画像のbytes。存在しない場合はNone
+    """
+    return BYTES_CACHE.get(file_path)
+
+
+def put_bytes(file_path: str, image_bytes: bytes):
+    """生成済み画像のbytesをメモリ上に保持します。
+
+    Args:
+        file_path (str): 画像の保存先
+        image_bytes (bytes): 画像のbytes
+    """
+    BYTES_CACHE.put(file_path, image_bytes)
+
+
+def stats() -> dict[str, int]:
+    """ディスク上のキャッシュのヒット数、ミス数などを返却します
+
+    Returns:
+        dict[str, int]: 統計情報
+    """
+    return URL_CACHE.stats()
+
+
+def memory_stats() -> dict[str, int]:
+    """メモリ上のキャッシュのヒット数、ミス数などを返却します
+
+    Returns:
+        dict[str, int]: 統計情報
+    """
+    return BYTES_CACHE.stats()
@@ -0,0 +1,272 @@
+from PIL import Image, ImageEnhance
+from pydantic import BaseModel, Field
+from typing import Any, Callable, Literal, Optional, Union
+from concurrent.futures import Future
+from lib.gen_image import GImage, ImageAnchors
+from lib.layer_cache import LayerCache
+from lib.sublayer_executor import SUBLAYER_EXECUTOR
+from string import Formatter
+import lib.metrics as metrics
+import time
+
+# 入力が同じであれば毎回同じになるレイヤーのキャッシュです
+LAYOUT_LAYER_CACHE = LayerCache("card_layout")
+
+# LayerSpec.builderから名前で参照する、レイヤーを生成する関数です
+BUILDERS: dict[str, Callable[[dict[str, Any]], Image.Image]] = {}
+
+__formatter = Formatter()
+
+
+class TextElement(BaseModel):
+    """文字を描画する要素です。textの"{nickname}"などはコンテキストの値に置き換えます。
+    """
+    type: Literal["text"] = "text"
+    text: str
+    position: tuple[int, int]
+    font_size: Optional[int] = None
+    font_color: Optional[tuple[int, int, int, int]] = None
+    anchor: Optional[str] = None
+    align: Optional[str] = None
+    # 指定した場合は幅に収まるようにフォントサイズを小さくします
+    max_width: Optional[int] = None
+    # 指定した名前のコンテキストの値が偽の場合は描画しません
+    when: Optional[str] = None
+
+
+class ImageElement(BaseModel):
+    """画像を合成する要素です。pathの"{name_card.icon.path}"などはコンテキストの値に置き換えます。
+    """
+    type: Literal["image"] = "image"
+    path: str
+    box: tuple[int, int] = (0, 0)
+    size: Optional[tuple[int, int]] = None
+    image_anchor: tuple[float, float] = ImageAnchors.LEFT_TOP
+    when: Optional[str] = None
+
+
+class FillElement(BaseModel):
+    """単色の矩形を合成する要素です。colorに文字列を指定した場合は、その名前のコンテキストの値を色として利用します。
+    """
+    type: Literal["fill"] = "fill"
+    box: tuple[int, int]
+    size: tuple[int, int]
+    color: Union[tuple[int, int, int, int], tuple[int, int, int], str]
+    when: Optional[str] = None
+
+
+class RepeatElement(BaseModel):
+    """コンテキストのリストの要素ごとにlayerを描画して合成する要素です。
+    n番目の要素はlayerをstepのn倍だけずらした位置に合成し、文字や画像のパスには要素のdictをコンテキストに重ねた値を埋め込みます。
+    """
+    type: Literal["repeat"] = "repeat"
+    items: str
+    layer: "LayerSpec"
+    step: tuple[int, int]
+    when: Optional[str] = None
+
+
+class LayerSpec(BaseModel):
+    """1枚のレイヤーの定義です。elementsを順に描画するか、builderに登録された関数で生成します。
+    elementsにLayerSpecを含めた場合は、別の画像に描画してからその位置に合成します。
+    座標はすべてカード全体の座標で指定します。
+    """
+    type: Literal["layer"] = "layer"
+    name: str
+    elements: list["Element"] = Field(default_factory=list)
+    # BUILDERSに登録された関数の名前。指定した場合はelementsを利用しません
+    builder: Optional[str] = None
+    # レイヤーのサイズと左上の位置。sizeがNoneの場合はカード全体のサイズです
+    size: Optional[tuple[int, int]] = None
+    offset: tuple[int, int] = (0, 0)
+    # レイヤーを合成する位置。builderで生成したレイヤーなどを移動する場合に利用します
+    box: tuple[int, int] = (0, 0)
+    image_anchor: tuple[float, float] = ImageAnchors.LEFT_TOP
+    default_font_size: int = 30
+    # 指定した場合は描画した後に明るさを変更します。1.0未満で暗くなります
+    brightness: Optional[float] = None
+    when: Optional[str] = None
+
+
+Element = Union[TextElement, ImageElement, FillElement, RepeatElement, LayerSpec]
+
+RepeatElement.update_forward_refs()
+LayerSpec.update_forward_refs()
+
+
+class CardSpec(BaseModel):
+    """カード画像のレイアウトの定義です。最初のレイヤーを土台にし、残りのレイヤーを順に合成します。
+    最初のレイヤーのwhenは利用しません。
+    jsonから読み込む場合はCardSpec.parse_fileを利用してください。
+    """
+    name: str
+    size: tuple[int, int]
+    layers: list[LayerSpec]
+
+
+def register_builder(name: str, builder: Callable[[dict[str, Any]], Image.Image]):
+    """LayerSpec.builderから参照する関数を登録します。
+
+    Args:
+        name (str): 関数の名前
+        builder (Callable[[dict[str, Any]], Image.Image]): コンテキストを受け取り、レイヤーの画像を返却する関数
+    """
+    BUILDERS[name] = builder
+
+
+def __fields(template: str) -> list[str]:
+    return [field for _, field, _, _ in __formatter.parse(template) if field is not None]
+
+
+def __resolve(template: str, context: dict[str, Any]) -> str:
+    return template.format_map(context)
+
+
+def __is_enabled(element: Element, context: dict[str, Any]) -> bool:
+    return element.when is None or bool(context.get(element.when))
+
+
+def __collect_cache_key(elements: list[Element], context: dict[str, Any], parts: list) -> bool:
+    """要素が参照しているコンテキストの値をpartsに追加します。
+
+    Args:
+        elements (list[Element]): 要素
+        context (dict[str, Any]): コンテキスト
+        parts (list): キャッシュのキーに含める値
+
+    Returns:
+        bool: キャッシュできる場合はTrue
+    """
+    for element in elements:
+        if element.when is not None:
+            enabled = __is_enabled(element, context)
+            parts.append(enabled)
+            if not enabled:
+                continue
+        if isinstance(element, TextElement) and __fields(element.text):
+            return False
+        if isinstance(element, ImageElement) and __fields(element.path):
+            parts.append(__resolve(element.path, context))
+        if isinstance(element, FillElement) and isinstance(element.color, str):
+            parts.append(tuple(context[element.color]))
+        if isinstance(element, RepeatElement):
+            return False
+        if isinstance(element, LayerSpec):
+            if element.builder is not None or not __collect_cache_key(element.elements, context, parts):
+                return False
+    return True
+
+
+def __cache_key(card: CardSpec, layer: LayerSpec, context: dict[str, Any]) -> Optional[tuple]:
+    """レイヤーがキャッシュできる場合はキャッシュのキーを返却します。
+    文字やリストがコンテキストに依存しないレイヤーは、参照している画像のパスなどが同じであれば同じ画像になるためキャッシュします。
+
+    Args:
+        card (CardSpec): カードの定義
+        layer (LayerSpec): レイヤーの定義
+        context (dict[str, Any]): コンテキスト
+
+    Returns:
+        Optional[tuple]: キャッシュのキー。キャッシュできない場合はNone
+    """
+    if layer.builder is not None:
+        return None
+    parts = []
+    if not __collect_cache_key(layer.elements, context, parts):
+        return None
+    return (card.name, layer.name, tuple(parts))
+
+
+def __draw_elements(card: CardSpec, img: GImage, elements: list[Element], context: dict[str, Any]):
+    for element in elements:
+        if not __is_enabled(element, context):
+            continue
+        if isinstance(element, TextElement):
+            params = {
+                "text": __resolve(element.text, context),
+                "position": element.position,
+                "font_size": element.font_size,
+                "font_color": element.font_color,
+                "anchor": element.anchor,
+                "align": element.align,
+            }
+            if element.max_width is None:
+                img.draw_text(**params)
+            else:
+                img.draw_text_with_max_width(max_width=element.max_width, **params)
+        elif isinstance(element, ImageElement):
+            img.add_image(
+                image_path=__resolve(element.path, context),
+                box=element.box,
+                size=element.size,
+                image_anchor=element.image_anchor,
+            )
+        elif isinstance(element, FillElement):
+            color = context[element.color] if isinstance(element.color, str) else element.color
+            img.paste(im=Image.new(mode="RGBA", size=element.size, color=color), box=element.box)
+        elif isinstance(element, RepeatElement):
+            for i, item in enumerate(context[element.items]):
+                shift = (element.step[0] * i, element.step[1] * i)
+                im = __draw_layer(card, element.layer, dict(context, **item))
+                __paste_layer(img, element.layer, im, shift)
+        else:
+            __paste_layer(img, element, __draw_layer(card, element, context), (0, 0))
+
+
+def __paste_layer(img: GImage, layer: LayerSpec, im: Image.Image, shift: tuple[int, int]):
+    img.paste(
+        im=im,
+        box=(layer.box[0] + layer.offset[0] + shift[0], layer.box[1] + layer.offset[1] + shift[1]),
+        image_anchor=layer.image_anchor,
+    )
+
+
+def __draw_layer(card: CardSpec, layer: LayerSpec, context: dict[str, Any]) -> Image.Image:
+    if layer.builder is not None:
+        return BUILDERS[layer.builder](context)
+
+    img = GImage(
+        box_size=layer.size or card.size,
+        default_font_size=layer.default_font_size,
+        offset=layer.offset,
+    )
+    __draw_elements(card, img, layer.elements, context)
+    if layer.brightness is not None:
+        return ImageEnhance.Brightness(img.get_image()).enhance(layer.brightness)
+    return img.get_image()
+
+
+def __render_layer(card: CardSpec, layer: LayerSpec, context: dict[str, Any]) -> Image.Image:
+    start = time.perf_counter()
+    key = __cache_key(card, layer, context)
+    if key is None:
+        im = __draw_layer(card, layer, context)
+    else:
+        im = LAYOUT_LAYER_CACHE.get_or_build(key, lambda: __draw_layer(card, layer, context))
+    if metrics.ENABLED:
+        metrics.RENDER_STAGE_SECONDS.observe(time.perf_counter() - start, card.name, layer.name)
+    return im
+
+
+def render(card: CardSpec, context: dict[str, Any]) -> Image.Image:
+    """レイアウトの定義に従ってカード画像を生成します。
+    各レイヤーは並列に生成し、定義の順に合成します。
+
+    Args:
+        card (CardSpec): カードの定義
+        context (dict[str, Any]): 文字や画像のパスに埋め込む値
+
+    Returns:
+        Image.Image: カード画像
+    """
+    layers = card.layers[:1] + [v for v in card.layers[1:] if __is_enabled(v, context)]
+    with SUBLAYER_EXECUTOR.scope() as pool:
+        futures: list[Future] = [
+            pool.submit(__render_layer, card, layer, context) for layer in layers
+        ]
+
+    # キャッシュされたレイヤーは共有されているため、土台はコピーして利用します
+    base = GImage(image=futures[0].result())
+    for layer, future in zip(layers[1:], futures[1:]):
+        __paste_layer(base, layer, future.result(), (0, 0))
+    return base.get_image()
@@ -1,5 +1,9 @@
 from PIL import Image, ImageFont, ImageDraw, ImageFilter, ImageChops
 from typing import TypeVar, Union
+from functools import lru_cache
+from lib.lru_cache import LRUCache
+import lib.asset_cache as asset_cache
+import math
 import os
 
 
@@ -67,15 +71,95 @@ class Algin:
 
 TypeGImage = TypeVar("TypeGImage", bound="GImage",)
 
+FONT_CACHE_SIZE = 256
 
-def _open_image(path: str, raise_exception: bool = True):
-    if os.path.exists(path):
-        return Image.open(path)
-    elif raise_exception:
-        raise FileNotFoundError(path)
-    else:
-        # pathが存在しない場合はデフォルトの場合は1pxの透明画像を返却します
-        return Image.new(mode="RGBA", size=[100, 100], color=Colors.CLEAR)
+
+@lru_cache(maxsize=FONT_CACHE_SIZE)
+def get_font(font_path: str, font_size: int) -> ImageFont.FreeTypeFont:
+    """フォントオブジェクトを取得します。一度読み込んだフォントはプロセス内で共有されます。
+    FreeTypeの処理はGILを保持したまま行われるため、スレッド間で共有しても問題ありません。
+
+    Args:
+        font_path (str): フォントパス
+        font_size (int): フォントサイズ
+
+    Returns:
+        ImageFont.FreeTypeFont: フォントオブジェクト
+    """
+    return ImageFont.truetype(font=font_path, size=font_size)
+
+
+def font_cache_stats() -> dict[str, int]:
+    """フォントキャッシュのヒット数などを返却します
+
+    Returns:
+        dict[str, int]: 統計情報
+    """
+    info = get_font.cache_info()
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "entries": info.currsize,
+        "max_entries": info.maxsize,
+    }
+
+
+# ラスタライズ済みの文字列のマスクを保持するバイト数の上限
+GLYPH_CACHE_MAX_BYTES = int(os.getenv("GLYPH_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+GLYPH_CACHE = LRUCache(
+    max_weight=GLYPH_CACHE_MAX_BYTES,
+    weigher=lambda v: v[0].size[0] * v[0].size[1],
+)
+
+
+def draw_glyph_run(
+    draw: ImageDraw.ImageDraw,
+    position: tuple[int, int],
+    text: str,
+    font: ImageFont.FreeTypeFont,
+    font_color: tuple[int, int, int, int] = None,
+    anchor: str = None,
+    align: str = None,
+) -> None:
+    """テキストを描画します。ImageDraw.textと同じ結果になります。
+    FreeTypeでラスタライズしたマスクをキャッシュし、同じ文字列は再利用して描画します。
+
+    Args:
+        draw (ImageDraw.ImageDraw): 描画先
+        position (tuple[int, int]): 描画位置
+        text (str): 描画するテキスト
+        font (ImageFont.FreeTypeFont): フォントオブジェクト
+        font_color (tuple[int, int, int, int], optional): フォントカラー. Defaults to None.
+        anchor (str, optional): 基準点. Defaults to None.
+        align (str, optional): テキストの左右中央そろえ. Defaults to None.
+    """
+    text = str(text)
+    # 複数行や色の名前が指定された場合はPillowにそのまま任せます
+    if "\n" in text or not (font_color is None or isinstance(font_color, tuple)):
+        draw.text(xy=position, text=text, fill=font_color, font=font, anchor=anchor, align=align)
+        return
+    # ImageDraw.textと同様に整数部分を描画位置、小数部分をラスタライズの開始位置とします
+    coord = (int(position[0]), int(position[1]))
+    start = (math.modf(position[0])[0], math.modf(position[1])[0])
+    key = (text, font.path, font.size, font_color, anchor, start, draw.fontmode)
+    mask, offset = GLYPH_CACHE.get_or_load(
+        key,
+        lambda: font.getmask2(text, draw.fontmode, anchor=anchor, start=start),
+    )
+    ink = draw.ink if font_color is None else draw.draw.draw_ink(font_color)
+    draw.draw.draw_bitmap((coord[0] + offset[0], coord[1] + offset[1]), mask, ink)
+
+
+def glyph_cache_stats() -> dict[str, float]:
+    """文字列キャッシュのヒット率などを返却します
+
+    Returns:
+        dict[str, float]: 統計情報
+    """
+    stats = GLYPH_CACHE.stats()
+    total = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = stats["hits"] / total if total else 0.0
+    return stats
 
 
 class GImage:
@@ -89,8 +173,12 @@ class GImage:
         default_font_path: str = "./font/ja-jp.ttf",
         default_font_size: int = 30,
         default_font_color: Colors = Colors.WHITE,
+        image: Image.Image = None,
+        offset: tuple[int, int] = (0, 0),
     ) -> None:
-        """コンストラクタです。image_pathもしくはbox_sizeを指定してイメージを作成します。
+        """コンストラクタです。image_path、box_size、imageのいずれかを指定してイメージを作成します。
+        offsetを指定した場合は、大きな画像の一部分だけを切り出したレイヤーとして扱います。
+        描画位置はoffsetを含めた元の画像の座標で指定し、pasteする際もoffsetの位置に合成されます。
 
         Args:
             image_path (str, optional): 画像のpath. Defaults to None.
@@ -98,23 +186,39 @@ class GImage:
             default_font_path (str, optional): デフォルトのフォントパス. Defaults to "uzura.ttf".
             default_font_size (int, optional): デフォルトのフォントサイズ. Defaults to 30.
             default_font_color (Colors, optional): デフォルトのフォントカラー. Defaults to Colors.WHITE.
+            image (Image.Image, optional): 元にするPillowのイメージ。コピーして利用します. Defaults to None.
+            offset (tuple[int, int], optional): 画像の左上の位置. Defaults to (0, 0).
 
         Raises:
             ValueError: image_path と boxの値が正しくない場合にraiseします
         """
         # raiseの種類たぶんカバレッジおいきれてないので他のエラー出たら気にしとく事
         if image_path is not None:
-            self.__image = _open_image(image_path).convert('RGBA').copy()
+            self.__image = asset_cache.open_image(image_path).copy()
+        elif image is not None:
+            self.__image = image.convert('RGBA')
         elif len(box_size) == 2:
             self.__image = Image.new(
                 mode="RGBA", size=box_size, color=Colors.CLEAR)
         else:
             raise ValueError(
                 "Either image path or box size, one value must be valid")
+        self.offset = offset
         self.set_default_font_color(default_font_color)
         self.set_default_font_size(default_font_size)
         self.set_font_path(default_font_path)
 
+    def __local(self, position: tuple[int, int]) -> tuple[int, int]:
+        """offsetを含めた座標を、このレイヤー内の座標に変換します。
+
+        Args:
+            position (tuple[int, int]): offsetを含めた座標
+
+        Returns:
+            tuple[int, int]: レイヤー内の座標
+        """
+        return (position[0] - self.offset[0], position[1] - self.offset[1])
+
     def set_default_font_size(self, font_size: int) -> None:
         """デフォルトのフォントサイズを指定します。
 
@@ -156,7 +260,7 @@ class GImage:
             font_size = self.default_font_size
         if font_path is None:
             font_path = self.font_path
-        return ImageFont.truetype(font=font_path, size=font_size)
+        return get_font(font_path, font_size)
 
     def get_image(self):
         """Pillowのイメージオブジェクトを返します
@@ -188,11 +292,12 @@ class GImage:
             font_path (str, optional): フォントパス. Defaults to None.
         """
         draw = ImageDraw.Draw(im=self.__image)
-        draw.text(
-            xy=position,
-            text=str(text),
-            fill=font_color,
+        draw_glyph_run(
+            draw=draw,
+            position=self.__local(position),
+            text=text,
             font=self.__get_font(font_path=font_path, font_size=font_size),
+            font_color=font_color,
             anchor=anchor,
             align=align,
         )
@@ -217,11 +322,12 @@ class GImage:
         if max_width < textsize[0]:
             font_size = int(font_size * max_width / textsize[0])
 
-        draw.text(
-            xy=position,
-            text=str(text),
-            fill=font_color,
+        draw_glyph_run(
+            draw=draw,
+            position=self.__local(position),
+            text=text,
             font=self.__get_font(font_path=font_path, font_size=font_size),
+            font_color=font_color,
             anchor=anchor,
             align=align,
         )
@@ -257,12 +363,14 @@ class GImage:
             raise ValueError(
                 "Because the same object is specified, PASTE cannot be performed.")
         if not isinstance(im, Image.Image):
+            # レイヤーの場合はoffsetの位置に合成します
+            box = (box[0] + im.offset[0], box[1] + im.offset[1])
             im = im.get_image()
 
-        box = (
+        box = self.__local((
             box[0] - int(im.size[0]*image_anchor[0]),
             box[1] - int(im.size[1]*image_anchor[1])
-        )
+        ))
         self.__image.alpha_composite(im=im, dest=box)
 
     def paste_with_shadow(
@@ -289,6 +397,7 @@ class GImage:
         Returns:
             Image.Image: 影付きの画像をペーストした結果の画像
         """
+        box = self.__local(box)
         # 影を作成
         shadow_base = Image.new('RGBA', self.__image.size)
         shadow_object = Image.new('RGBA', (im.width + shadow_size * 2, im.height + shadow_size * 2))
@@ -323,29 +432,16 @@ class GImage:
             image_path (str): 画像のPath
             box (tuple[int, int], optional): 描画位置. Defaults to (0, 0).
             size (tuple[int, int], optional): 画像サイズ（縦横比を固定しているため、はみ出る部分の上限として考えてください）. Defaults to None.
+            scale (int, optional): 画像の倍率(%). Defaults to None.
             image_anchor (tuple[int, int], optional): 基準点. Defaults to ImageAnchors.LEFT_TOP.
         """
-        im = _open_image(image_path).convert('RGBA')
-        if size is not None:
-            x = size[0]
-            y = size[1]
-            aspect_ratio = im.size[0] / im.size[1]
-            resize_ratio = x / y
-            if aspect_ratio > resize_ratio:
-                x = int(y*aspect_ratio)
-            else:
-                y = int(x*aspect_ratio)
-            im = im.resize(size=size)
-        elif scale is not None:
-
-            x = im.size[0] * scale // 100
-            y = im.size[1] * scale // 100
-            im = im.resize(size=(x, y))
-
-        box = (
+        # デコードとリサイズの結果はキャッシュされるため、同じ画像の2回目以降はファイルを読み込みません
+        im = asset_cache.open_image(image_path, size=size, scale=scale)
+
+        box = self.__local((
             box[0] - int(im.size[0]*image_anchor[0]),
             box[1] - int(im.size[1]*image_anchor[1])
-        )
+        ))
         self.__image.alpha_composite(im=im, dest=box)
 
     def add_rotate_image(
@@ -364,18 +460,20 @@ class GImage:
             size (tuple[int, int], optional): 画像サイズ（縦横比を固定しているため、はみ出る部分の上限として考えてください）. Defaults to None.
             image_anchor (tuple[int, int], optional): 基準点. Defaults to ImageAnchors.LEFT_TOP.
         """
-        im = _open_image(image_path).convert('RGBA')
+        im = asset_cache.open_image(image_path)
         if size is not None:
+            # thumbnailは画像自体を書き換えるためキャッシュをコピーして利用します
+            im = im.copy()
             im.thumbnail(size=size)
         bg = Image.new(mode="RGBA", size=(
             im.size[0]*2, im.size[1]*2), color=Colors.CLEAR)
         diff = (im.size[0]//2, im.size[1]//2)
         bg.alpha_composite(im=im, dest=diff)
         bg = bg.rotate(angle=angle, resample=Image.BICUBIC)
-        box = (
+        box = self.__local((
             box[0] - int(im.size[0]*image_anchor[0])-diff[0],
             box[1] - int(im.size[1]*image_anchor[1])-diff[1]
-        )
+        ))
         self.__image.alpha_composite(im=bg, dest=box)
 
     def show(self):
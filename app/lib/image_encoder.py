@@ -0,0 +1,115 @@
+from fastapi import HTTPException
+from pydantic import BaseModel
+from PIL import Image
+from io import BytesIO
+from typing import Optional
+import lib.metrics as metrics
+import os
+
+JPEG = "JPEG"
+PNG = "PNG"
+WEBP = "WEBP"
+
+EXTENSIONS = {
+    JPEG: ".jpg",
+    PNG: ".png",
+    WEBP: ".webp",
+}
+
+MEDIA_TYPES = {
+    ".jpg": "image/jpeg",
+    ".png": "image/png",
+    ".webp": "image/webp",
+}
+
+
+class EncodeProfile(BaseModel):
+    """画像のエンコード設定です。
+    formatがNoneの場合は各画像の標準の形式(キャラクターはJPEG、ランキングはPNG)で出力します。
+    """
+    name: str
+    format: Optional[str] = None
+    quality: Optional[int] = None
+    optimize: bool = False
+    # JPEGのクロマサブサンプリング。0: 4:4:4, 1: 4:2:2, 2: 4:2:0
+    subsampling: Optional[int] = None
+    # PNGの圧縮レベル(0-9)
+    compress_level: Optional[int] = None
+    # WebPの圧縮方法(0-6)。大きいほど遅く、小さくなります
+    method: Optional[int] = None
+
+
+PROFILES: dict[str, EncodeProfile] = {
+    # 従来と同じ出力です
+    "original": EncodeProfile(name="original", optimize=True, quality=100),
+    "high": EncodeProfile(name="high", format=JPEG, quality=95, subsampling=0),
+    "fast": EncodeProfile(name="fast", format=JPEG, quality=85, subsampling=2),
+    "png": EncodeProfile(name="png", format=PNG, compress_level=1),
+    "webp": EncodeProfile(name="webp", format=WEBP, quality=85, method=4),
+}
+
+DEFAULT_PROFILE = os.getenv("IMAGE_PROFILE", "original")
+
+
+def get_profile(name: Optional[str] = None) -> EncodeProfile:
+    """名前からエンコード設定を取得します。Noneの場合はサーバーの標準設定を返却します。
+
+    Args:
+        name (Optional[str], optional): 設定の名前. Defaults to None.
+
+    Raises:
+        HTTPException: 設定が存在しない場合に400をraiseします
+
+    Returns:
+        EncodeProfile: エンコード設定
+    """
+    if name is None:
+        name = DEFAULT_PROFILE
+    if name not in PROFILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"profile {name} is not found. ({', '.join(PROFILES.keys())})",
+        )
+    return PROFILES[name]
+
+
+def get_extension(profile: EncodeProfile, default_format: str = JPEG) -> str:
+    """エンコード後のファイルの拡張子を返却します
+
+    Args:
+        profile (EncodeProfile): エンコード設定
+        default_format (str, optional): 画像の標準の形式. Defaults to JPEG.
+
+    Returns:
+        str: 拡張子
+    """
+    return EXTENSIONS[profile.format or default_format]
+
+
+@metrics.timed(metrics.OPERATION_SECONDS, "encode")
+def encode(image: Image.Image, profile: EncodeProfile, default_format: str = JPEG) -> bytes:
+    """画像をエンコード設定に従ってエンコードします。
+
+    Args:
+        image (Image.Image): 画像
+        profile (EncodeProfile): エンコード設定
+        default_format (str, optional): 画像の標準の形式. Defaults to JPEG.
+
+    Returns:
+        bytes: エンコードした画像のbytes
+    """
+    image_format = profile.format or default_format
+    params = {"optimize": profile.optimize}
+    if image_format == JPEG and image.mode != "RGB":
+        image = image.convert("RGB")
+    if profile.quality is not None:
+        params["quality"] = profile.quality
+    if profile.subsampling is not None and image_format == JPEG:
+        params["subsampling"] = profile.subsampling
+    if profile.compress_level is not None and image_format == PNG:
+        params["compress_level"] = profile.compress_level
+    if profile.method is not None and image_format == WEBP:
+        params["method"] = profile.method
+    fileio = BytesIO()
+    image.save(fileio, format=image_format, **params)
+    return fileio.getvalue()
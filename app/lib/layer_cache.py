@@ -0,0 +1,136 @@
+from PIL import Image
+from lib.lru_cache import LRUCache
+from lib.asset_cache import image_bytes
+from threading import Lock
+from typing import Callable, Hashable
+import hashlib
+import glob
+import os
+
+# すべてのLayerCacheで共有するメモリ上の上限です。
+# プロセスごとの上限のため、RENDER_POOL_TYPEがprocessの場合はワーカー数を掛けた分まで利用します
+MAX_CACHE_BYTES = int(os.getenv("LAYER_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+# 指定された場合は合成済みのレイヤーをpngとして保存し、再起動後も利用します
+PERSIST_DIR = os.getenv("LAYER_CACHE_DIR")
+# "1"の場合は起動時とキャラクターデータ更新時にすべてのレイヤーを事前に生成します
+# 全キャラクター分はメモリの上限を超えるため、LAYER_CACHE_DIRと併用してディスクに保存してください
+PREWARM = os.getenv("LAYER_CACHE_PREWARM") == "1"
+
+LAYER_CACHES: dict[str, "LayerCache"] = {}
+
+# すべてのLayerCacheのレイヤーを保持するLRUキャッシュです。キーは(キャッシュの名前, レイヤーのキー)です
+SHARED_CACHE = LRUCache(max_weight=MAX_CACHE_BYTES, weigher=image_bytes)
+
+
+class LayerCache:
+    """背景などの入力が同じであれば毎回同じになるレイヤー画像をキャッシュします。
+    メモリ上ではすべてのLayerCacheでSHARED_CACHEを共有し、合計がMAX_CACHE_BYTESを超えると古いレイヤーから破棄します。
+    PERSIST_DIRが指定されている場合はディスクにも保存します。
+    """
+
+    def __init__(self, name: str, persist_dir: str = PERSIST_DIR) -> None:
+        """コンストラクタです。生成したキャッシュはLAYER_CACHESに登録されます。
+
+        Args:
+            name (str): キャッシュの名前
+            persist_dir (str, optional): ディスクに保存するディレクトリ. Defaults to PERSIST_DIR.
+        """
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.__lock = Lock()
+        self.persist_dir = None
+        if persist_dir is not None:
+            self.persist_dir = os.path.join(persist_dir, name)
+            os.makedirs(self.persist_dir, exist_ok=True)
+        LAYER_CACHES[name] = self
+
+    def __file_path(self, key: Hashable) -> str:
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.persist_dir, f"{digest}.png")
+
+    def __load(self, key: Hashable, builder: Callable[[], Image.Image]) -> Image.Image:
+        if self.persist_dir is None:
+            return builder()
+        file_path = self.__file_path(key)
+        if os.path.exists(file_path):
+            try:
+                im = Image.open(file_path)
+                im.load()
+                return im
+            except OSError:
+                pass
+        im = builder()
+        # 書き込み途中のファイルを読まないように一時ファイルから置き換えます
+        tmp_path = f"{file_path}.{os.getpid()}.tmp"
+        im.save(tmp_path, format="PNG", compress_level=1)
+        os.replace(tmp_path, file_path)
+        return im
+
+    def get_or_build(self, key: Hashable, builder: Callable[[], Image.Image]) -> Image.Image:
+        """キャッシュされたレイヤーを取得します。存在しない場合はbuilderで生成します。
+        返却される画像は共有されているため、変更する場合は必ずcopyしてください。
+
+        Args:
+            key (Hashable): レイヤーの入力を表すキー
+            builder (Callable[[], Image.Image]): レイヤーを生成する関数
+
+        Returns:
+            Image.Image: レイヤー画像
+        """
+        sentinel = object()
+        shared_key = (self.name, key)
+        im = SHARED_CACHE.get(shared_key, sentinel)
+        with self.__lock:
+            if im is sentinel:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if im is sentinel:
+            im = self.__load(key, builder)
+            SHARED_CACHE.put(shared_key, im)
+        return im
+
+    def clear(self):
+        """このキャッシュのメモリ上とディスク上のレイヤーを破棄します。
+        """
+        SHARED_CACHE.remove_if(lambda shared_key: shared_key[0] == self.name)
+        if self.persist_dir is None:
+            return
+        for file_path in glob.glob(os.path.join(self.persist_dir, "*.png")):
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+
+    def stats(self) -> dict[str, int]:
+        """ヒット数などの統計情報を返却します。max_weightはすべてのLayerCacheで共有する上限です。
+
+        Returns:
+            dict[str, int]: 統計情報
+        """
+        weights = [weight for shared_key, weight in SHARED_CACHE.weights() if shared_key[0] == self.name]
+        with self.__lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(weights),
+                "weight": sum(weights),
+                "max_weight": MAX_CACHE_BYTES,
+            }
+
+
+def clear_all():
+    """すべてのレイヤーキャッシュを破棄します。キャラクターデータや位置情報が更新された場合に利用します。
+    """
+    for cache in LAYER_CACHES.values():
+        cache.clear()
+
+
+def stats() -> dict[str, dict[str, int]]:
+    """レイヤーキャッシュごとの統計情報を返却します
+
+    Returns:
+        dict[str, dict[str, int]]: キャッシュの名前と統計情報
+    """
+    return {name: cache.stats() for name, cache in LAYER_CACHES.items()}
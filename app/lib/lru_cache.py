@@ -0,0 +1,137 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Hashable
+
+
+class LRUCache:
+    """スレッドセーフなLRUキャッシュです。
+    weigherで各値の重さ（バイト数など）を算出し、合計がmax_weightを超えると古いものから破棄します。
+    """
+
+    def __init__(
+        self,
+        max_weight: int,
+        weigher: Callable[[Any], int] = lambda v: 1,
+        on_evict: Callable[[Hashable, Any], None] = None,
+    ) -> None:
+        """コンストラクタです。
+
+        Args:
+            max_weight (int): 保持する値の重さの上限
+            weigher (Callable[[Any], int], optional): 値の重さを返す関数. Defaults to 1件=1.
+            on_evict (Callable[[Hashable, Any], None], optional): 上限を超えて破棄された際にキーと値を受け取る関数. Defaults to None.
+        """
+        self.max_weight = max_weight
+        self.weigher = weigher
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self.weight = 0
+        self.__data: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self.__lock = Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """キーに対応する値を取得します。存在しない場合はdefaultを返却します。
+
+        Args:
+            key (Hashable): キー
+            default (Any, optional): 存在しない場合の値. Defaults to None.
+
+        Returns:
+            Any: キャッシュされた値
+        """
+        with self.__lock:
+            if key in self.__data:
+                self.__data.move_to_end(key)
+                self.hits += 1
+                return self.__data[key][0]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """値をキャッシュします。上限を超える場合は古い値から破棄します。
+
+        Args:
+            key (Hashable): キー
+            value (Any): 値
+        """
+        weight = self.weigher(value)
+        evicted: list[tuple[Hashable, Any]] = []
+        with self.__lock:
+            if key in self.__data:
+                self.weight -= self.__data.pop(key)[1]
+            # 単体で上限を超えるものはキャッシュしない
+            if weight > self.max_weight:
+                evicted.append((key, value))
+            else:
+                self.__data[key] = (value, weight)
+                self.weight += weight
+            while self.weight > self.max_weight:
+                old_key, (old_value, old_weight) = self.__data.popitem(last=False)
+                self.weight -= old_weight
+                evicted.append((old_key, old_value))
+        if self.on_evict is not None:
+            for old_key, old_value in evicted:
+                self.on_evict(old_key, old_value)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """キーに対応する値を取得します。存在しない場合はloaderで生成してキャッシュします。
+        生成処理はロックの外で行うため、同時に同じキーを要求された場合は複数回生成されることがあります。
+
+        Args:
+            key (Hashable): キー
+            loader (Callable[[], Any]): 値を生成する関数
+
+        Returns:
+            Any: キャッシュされた値
+        """
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = loader()
+            self.put(key, value)
+        return value
+
+    def remove_if(self, predicate: Callable[[Hashable], bool]) -> None:
+        """predicateがTrueを返すキーの値を破棄します。on_evictは呼び出しません。
+
+        Args:
+            predicate (Callable[[Hashable], bool]): キーを受け取り、破棄する場合にTrueを返す関数
+        """
+        with self.__lock:
+            for key in [k for k in self.__data if predicate(k)]:
+                self.weight -= self.__data.pop(key)[1]
+
+    def weights(self) -> list[tuple[Hashable, int]]:
+        """保持しているキーと重さの一覧を返却します。
+
+        Returns:
+            list[tuple[Hashable, int]]: キーと重さ
+        """
+        with self.__lock:
+            return [(k, v[1]) for k, v in self.__data.items()]
+
+    def clear(self) -> None:
+        """キャッシュをすべて破棄します。カウンタは維持されます。
+        """
+        with self.__lock:
+            self.__data.clear()
+            self.weight = 0
+
+    def stats(self) -> dict[str, int]:
+        """ヒット数などの統計情報を返却します。
+
+        Returns:
+            dict[str, int]: 統計情報
+        """
+        with self.__lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self.__data),
+                "weight": self.weight,
+                "max_weight": self.max_weight,
+            }
+
+    def __len__(self) -> int:
+        return len(self.__data)
@@ -0,0 +1,183 @@
+from threading import Lock
+from typing import Any, Callable, Iterable, Optional
+import functools
+import inspect
+import time
+import os
+
+# "1"の場合のみ処理時間を計測します。無効の場合、timedは関数をそのまま返却するため負荷はありません
+ENABLED = os.getenv("METRICS") == "1"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HISTOGRAMS: dict[str, "Histogram"] = {}
+
+
+def format_labels(labels: Iterable[tuple[str, Any]]) -> str:
+    """ラベルをPrometheusのテキスト形式に変換します
+
+    Args:
+        labels (Iterable[tuple[str, Any]]): ラベル名と値
+
+    Returns:
+        str: {name="value",...}の形式の文字列。ラベルがない場合は空文字
+    """
+    labels = [
+        k + '="' + str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for k, v in labels
+    ]
+    if not labels:
+        return ""
+    return "{" + ",".join(labels) + "}"
+
+
+def format_sample(name: str, value: float, labels: Optional[dict[str, Any]] = None) -> str:
+    """Prometheusのテキスト形式の1行を返却します
+
+    Args:
+        name (str): メトリクス名
+        value (float): 値
+        labels (Optional[dict[str, Any]], optional): ラベル. Defaults to None.
+
+    Returns:
+        str: 1行分の文字列
+    """
+    return f"{name}{format_labels((labels or {}).items())} {float(value)}"
+
+
+class Histogram:
+    """Prometheusのヒストグラムです。ラベルの値の組み合わせごとにバケットを保持します。
+    """
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        """コンストラクタです。生成したヒストグラムはHISTOGRAMSに登録され、/metricsに出力されます。
+
+        Args:
+            name (str): メトリクス名
+            help (str): 説明
+            labelnames (tuple[str, ...], optional): ラベル名. Defaults to ().
+            buckets (tuple[float, ...], optional): バケットの上限値. Defaults to DEFAULT_BUCKETS.
+        """
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # ラベルの値 -> [各バケットの件数, 合計, 件数]
+        self.__values: dict[tuple[str, ...], list] = {}
+        self.__lock = Lock()
+        HISTOGRAMS[name] = self
+
+    def observe(self, value: float, *labels: str):
+        """値を記録します
+
+        Args:
+            value (float): 値
+            *labels (str): labelnamesの順のラベルの値
+        """
+        with self.__lock:
+            entry = self.__values.get(labels)
+            if entry is None:
+                entry = [[0] * len(self.buckets), 0.0, 0]
+                self.__values[labels] = entry
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def expose(self) -> list[str]:
+        """Prometheusのテキスト形式で返却します
+
+        Returns:
+            list[str]: 各行の文字列
+        """
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.__lock:
+            values = {k: (list(v[0]), v[1], v[2]) for k, v in self.__values.items()}
+        for labels, (buckets, total, count) in values.items():
+            base = list(zip(self.labelnames, labels))
+            for bound, bucket_count in zip(self.buckets, buckets):
+                lines.append(f"{self.name}_bucket{format_labels(base + [('le', bound)])} {float(bucket_count)}")
+            lines.append(f"{self.name}_bucket{format_labels(base + [('le', '+Inf')])} {float(count)}")
+            lines.append(f"{self.name}_sum{format_labels(base)} {total}")
+            lines.append(f"{self.name}_count{format_labels(base)} {float(count)}")
+        return lines
+
+
+def timed(histogram: Histogram, *labels: str) -> Callable[[Callable], Callable]:
+    """関数の処理時間を秒でhistogramに記録するデコレーターです。async関数にも利用できます。
+    ENABLEDがFalseの場合は関数をそのまま返却します。
+
+    Args:
+        histogram (Histogram): 記録先のヒストグラム
+        *labels (str): labelnamesの順のラベルの値
+
+    Returns:
+        Callable[[Callable], Callable]: デコレーター
+    """
+    def decorator(func: Callable) -> Callable:
+        if not ENABLED:
+            return func
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - start, *labels)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start, *labels)
+        return wrapper
+    return decorator
+
+
+def expose_samples(name: str, type: str, help: str, samples: list[tuple[dict[str, Any], float]]) -> list[str]:
+    """gaugeやcounterをPrometheusのテキスト形式で返却します
+
+    Args:
+        name (str): メトリクス名
+        type (str): "gauge"または"counter"
+        help (str): 説明
+        samples (list[tuple[dict[str, Any], float]]): ラベルと値
+
+    Returns:
+        list[str]: 各行の文字列
+    """
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {type}"]
+    lines += [format_sample(name, value, labels) for labels, value in samples]
+    return lines
+
+
+def expose_histograms() -> list[str]:
+    """登録されているすべてのヒストグラムをPrometheusのテキスト形式で返却します
+
+    Returns:
+        list[str]: 各行の文字列
+    """
+    lines = []
+    for histogram in HISTOGRAMS.values():
+        lines += histogram.expose()
+    return lines
+
+
+# 画像生成の各段階の処理時間です。generatorは生成元、stageは処理の名前です
+RENDER_STAGE_SECONDS = Histogram(
+    "genshin_render_stage_seconds",
+    "Time spent in each stage of image generation.",
+    ("generator", "stage"),
+)
+# エンコード、ディスクへの保存、enkaからの取得などの処理時間です
+OPERATION_SECONDS = Histogram(
+    "genshin_operation_seconds",
+    "Time spent in encoding, disk writes and upstream fetches.",
+    ("operation",),
+)
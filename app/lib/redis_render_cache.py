@@ -0,0 +1,140 @@
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+from typing import Any, Optional
+import time
+import os
+
+# "1"の場合、生成済み画像をRedisに保存して複数のAPIサーバーで共有します
+ENABLED = os.getenv("RENDER_CACHE_REDIS") == "1"
+HOST = os.getenv("RENDER_CACHE_REDIS_HOST", "redis")
+PORT = int(os.getenv("RENDER_CACHE_REDIS_PORT", 6379))
+TTL = int(os.getenv("RENDER_CACHE_REDIS_TTL", 60 * 60))
+# Redisに保存する画像の合計バイト数の上限。compose.yamlのredisはメモリ128MBで動いています
+MAX_BYTES = int(os.getenv("RENDER_CACHE_REDIS_MAX_BYTES", 64 * 1024 * 1024))
+KEY_PREFIX = "render:"
+
+
+class RedisRenderCache:
+    """生成済み画像のbytesをRedisに保存するキャッシュです。
+    各画像はTTL付きで保存し、合計サイズがmax_bytesを超えた場合は最も参照されていないものから削除します。
+    Redisに接続できない場合はキャッシュが存在しないものとして扱います。
+    """
+
+    def __init__(
+        self,
+        client: aioredis.Redis,
+        ttl: int = TTL,
+        max_bytes: int = MAX_BYTES,
+        prefix: str = KEY_PREFIX,
+    ) -> None:
+        """コンストラクタです。
+
+        Args:
+            client (aioredis.Redis): Redisのクライアント。同じコマンドを持つものであれば差し替えられます
+            ttl (int, optional): 画像を保持する秒数. Defaults to TTL.
+            max_bytes (int, optional): 保持する画像の合計バイト数の上限. Defaults to MAX_BYTES.
+            prefix (str, optional): Redisのキーの接頭辞. Defaults to KEY_PREFIX.
+        """
+        self.client = client
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.prefix = prefix
+        # 参照順を保持するsorted set、各画像のサイズ、合計サイズのキーです
+        self.index_key = f"{prefix}index"
+        self.sizes_key = f"{prefix}sizes"
+        self.total_key = f"{prefix}bytes"
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.evictions = 0
+
+    async def get(self, name: str) -> Optional[bytes]:
+        """画像を取得します。
+
+        Args:
+            name (str): 画像の名前
+
+        Returns:
+            Optional[bytes]: 画像のbytes。存在しない場合はNone
+        """
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                pipe.get(self.prefix + name)
+                # 参照された画像を削除対象の後ろに回します
+                pipe.zadd(self.index_key, {name: time.time()}, xx=True)
+                data, _ = await pipe.execute()
+        except RedisError as e:
+            self.errors += 1
+            print(f"redis render cache get error: {e}")
+            return None
+        if data is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return data
+
+    async def put(self, name: str, data: bytes):
+        """画像を保存します。合計サイズが上限を超えた場合は古いものを削除します。
+
+        Args:
+            name (str): 画像の名前
+            data (bytes): 画像のbytes
+        """
+        if len(data) > self.max_bytes:
+            return
+        try:
+            async with self.client.pipeline(transaction=True) as pipe:
+                pipe.set(self.prefix + name, data, ex=self.ttl)
+                pipe.zadd(self.index_key, {name: time.time()})
+                pipe.hget(self.sizes_key, name)
+                pipe.hset(self.sizes_key, name, len(data))
+                pipe.incrby(self.total_key, len(data))
+                _, _, old_size, _, total = await pipe.execute()
+            if old_size is not None:
+                total = await self.client.decrby(self.total_key, int(old_size))
+            await self.__evict(total)
+        except RedisError as e:
+            self.errors += 1
+            print(f"redis render cache put error: {e}")
+
+    async def __evict(self, total: int):
+        # TTLで消えた画像もサイズは残っているため、ここで削除されるまで合計に含まれます
+        while total > self.max_bytes:
+            popped = await self.client.zpopmin(self.index_key, 1)
+            if not popped:
+                break
+            name = popped[0][0]
+            if isinstance(name, bytes):
+                name = name.decode()
+            async with self.client.pipeline(transaction=True) as pipe:
+                pipe.hget(self.sizes_key, name)
+                pipe.hdel(self.sizes_key, name)
+                pipe.delete(self.prefix + name)
+                size, _, _ = await pipe.execute()
+            total = await self.client.decrby(self.total_key, int(size or 0))
+            self.evictions += 1
+
+    async def stats(self) -> dict[str, Any]:
+        """統計情報を返却します
+
+        Returns:
+            dict[str, Any]: 統計情報
+        """
+        try:
+            total = int(await self.client.get(self.total_key) or 0)
+        except RedisError:
+            total = None
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "evictions": self.evictions,
+            "weight": total,
+            "max_weight": self.max_bytes,
+            "ttl": self.ttl,
+        }
+
+
+REDIS_RENDER_CACHE: Optional[RedisRenderCache] = None
+if ENABLED:
+    REDIS_RENDER_CACHE = RedisRenderCache(aioredis.Redis(host=HOST, port=PORT))
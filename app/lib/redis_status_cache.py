@@ -0,0 +1,100 @@
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+from typing import Any, Optional
+import json
+import os
+
+HOST = os.getenv("STATUS_CACHE_REDIS_HOST", "redis")
+PORT = int(os.getenv("STATUS_CACHE_REDIS_PORT", 6379))
+MAX_CONNECTIONS = int(os.getenv("STATUS_CACHE_REDIS_MAX_CONNECTIONS", 32))
+# ユーザーデータを保持する秒数。enkaのttlの方が長い場合はそちらを利用します
+TTL = int(os.getenv("STATUS_CACHE_TTL", 600))
+# enkaが4xxを返したUIDの結果を保持する秒数
+NEGATIVE_TTL = int(os.getenv("ENKA_NEGATIVE_TTL", 60))
+
+
+class RedisStatusCache:
+    """enkaから取得したユーザーデータをUIDごとにRedisに保存するキャッシュです。
+    enkaがエラーを返した場合は、その内容を同じキーに短時間保存します。
+    Redisに接続できない場合はキャッシュが存在しないものとして扱います。
+    """
+
+    def __init__(
+        self,
+        client: aioredis.Redis,
+        ttl: int = TTL,
+        negative_ttl: int = NEGATIVE_TTL,
+    ) -> None:
+        """コンストラクタです。
+
+        Args:
+            client (aioredis.Redis): Redisのクライアント。fakeredisなど同じコマンドを持つものであれば差し替えられます
+            ttl (int, optional): ユーザーデータを保持する秒数. Defaults to TTL.
+            negative_ttl (int, optional): エラーを保持する秒数. Defaults to NEGATIVE_TTL.
+        """
+        self.client = client
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.errors = 0
+
+    async def get(self, uid: int) -> Optional[dict[str, Any]]:
+        """保存されたユーザーデータを取得します。
+        エラーが保存されている場合は{"error": {"status_code": int, "detail": str}}を返却します。
+
+        Args:
+            uid (int): UID
+
+        Returns:
+            Optional[dict[str, Any]]: ユーザーデータのdict。存在しない場合はNone
+        """
+        try:
+            data = await self.client.get(uid)
+        except RedisError as e:
+            self.errors += 1
+            print(f"redis status cache get error: {e}")
+            return None
+        if data is None:
+            return None
+        return json.loads(data)
+
+    async def put(self, uid: int, user_data_json: str, ttl: Optional[int] = None):
+        """ユーザーデータを保存します。
+
+        Args:
+            uid (int): UID
+            user_data_json (str): ユーザーデータのjson
+            ttl (Optional[int], optional): enkaのttl。self.ttlより長い場合はこちらを利用します. Defaults to None.
+        """
+        await self.__set(uid, user_data_json, max(self.ttl, ttl or 0))
+
+    async def put_error(self, uid: int, status_code: int, detail: Any):
+        """enkaが返したエラーを保存します。
+
+        Args:
+            uid (int): UID
+            status_code (int): レスポンスのステータスコード
+            detail (Any): エラーの内容
+        """
+        data = json.dumps({"error": {"status_code": status_code, "detail": detail}})
+        await self.__set(uid, data, self.negative_ttl)
+
+    async def __set(self, uid: int, data: str, ttl: int):
+        try:
+            # SET EXで値とTTLを1回のコマンドで保存します
+            await self.client.set(uid, data, ex=ttl)
+        except RedisError as e:
+            self.errors += 1
+            print(f"redis status cache set error: {e}")
+
+    async def close(self):
+        """接続プールを閉じます
+        """
+        await self.client.close(close_connection_pool=True)
+
+
+STATUS_CACHE = RedisStatusCache(
+    aioredis.Redis(
+        # 接続数が上限に達した場合はエラーにせず、空くまで待機します
+        connection_pool=aioredis.BlockingConnectionPool(host=HOST, port=PORT, max_connections=MAX_CONNECTIONS),
+    )
+)
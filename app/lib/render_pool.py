@@ -0,0 +1,162 @@
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from fastapi import HTTPException
+from threading import Lock
+from typing import Any, Callable
+import multiprocessing
+import asyncio
+import os
+
+THREAD = "thread"
+PROCESS = "process"
+
+POOL_TYPE = os.getenv("RENDER_POOL_TYPE", THREAD)
+POOL_SIZE = int(os.getenv("RENDER_POOL_SIZE", os.cpu_count() or 1))
+# 実行中のものとは別に待機できるリクエスト数
+QUEUE_SIZE = int(os.getenv("RENDER_QUEUE_SIZE", POOL_SIZE * 4))
+RETRY_AFTER = int(os.getenv("RENDER_RETRY_AFTER", 5))
+
+
+class RenderPool:
+    """画像生成を行う専用のワーカープールです。
+    実行中と待機中の合計がpool_size + queue_sizeを超える場合は503を返却します。
+    """
+
+    def __init__(
+        self,
+        pool_type: str = POOL_TYPE,
+        pool_size: int = POOL_SIZE,
+        queue_size: int = QUEUE_SIZE,
+        retry_after: int = RETRY_AFTER,
+        initializer: Callable = None,
+        initargs: tuple = (),
+    ) -> None:
+        """コンストラクタです。
+
+        Args:
+            pool_type (str, optional): "thread"もしくは"process". Defaults to POOL_TYPE.
+            pool_size (int, optional): ワーカー数. Defaults to POOL_SIZE.
+            queue_size (int, optional): 待機できるリクエスト数. Defaults to QUEUE_SIZE.
+            retry_after (int, optional): 503の場合に返却するRetry-Afterの秒数. Defaults to RETRY_AFTER.
+            initializer (Callable, optional): プロセスの場合に各ワーカーの起動時に実行する関数. Defaults to None.
+            initargs (tuple, optional): initializerの引数. Defaults to ().
+
+        Raises:
+            ValueError: pool_typeが正しくない場合にraiseします
+        """
+        if pool_type not in (THREAD, PROCESS):
+            raise ValueError(f"Unknown render pool type: {pool_type}")
+        self.pool_type = pool_type
+        self.pool_size = pool_size
+        self.queue_size = queue_size
+        self.retry_after = retry_after
+        self.initializer = initializer
+        self.initargs = initargs
+        self.in_flight = 0
+        self.rejected = 0
+        self.__executor: Executor = None
+        self.__lock = Lock()
+        # 空きを待っている呼び出し元のイベントループと、空いた際に完了させるFutureです
+        self.__waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def __get_executor(self) -> Executor:
+        # 不要なワーカーを持たないよう、初回利用時に生成します
+        if self.__executor is None:
+            if self.pool_type == PROCESS:
+                # 監視スレッドなどを持つ親プロセスをforkしないようspawnで起動します
+                self.__executor = ProcessPoolExecutor(
+                    max_workers=self.pool_size,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=self.initializer,
+                    initargs=self.initargs,
+                )
+            else:
+                self.__executor = ThreadPoolExecutor(
+                    max_workers=self.pool_size,
+                    thread_name_prefix="render",
+                )
+        return self.__executor
+
+    async def run(self, func: Callable, *args: Any, wait: bool = False) -> Any:
+        """ワーカープールで関数を実行し、結果を待機します。
+        イベントループ上でのみ呼び出してください。
+
+        Args:
+            func (Callable): 実行する関数。プロセスの場合はpickle可能である必要があります
+            *args (Any): 関数の引数
+            wait (bool, optional): Trueの場合、待機数が上限を超えていても503にせず空きを待ちます。
+                レスポンスの送信開始後に生成するため、エラーを返せない場合に利用します. Defaults to False.
+
+        Raises:
+            HTTPException: waitがFalseで、待機数が上限を超えている場合に503をraiseします
+
+        Returns:
+            Any: 関数の戻り値
+        """
+        while True:
+            with self.__lock:
+                if self.in_flight < self.pool_size + self.queue_size:
+                    self.in_flight += 1
+                    break
+                if not wait:
+                    self.rejected += 1
+                    raise HTTPException(
+                        status_code=503,
+                        detail="画像生成が混み合っています。しばらくしてから再度お試しください。",
+                        headers={"Retry-After": str(self.retry_after)},
+                    )
+                loop = asyncio.get_running_loop()
+                waiter = loop.create_future()
+                self.__waiters.append((loop, waiter))
+            await waiter
+        try:
+            future = self.__get_executor().submit(func, *args)
+        except BaseException:
+            self.__release()
+            raise
+        # クライアントが切断しても実行中の処理は止まらないため、完了時に枠を解放します
+        future.add_done_callback(self.__release)
+        return await asyncio.wrap_future(future)
+
+    def __release(self, *_):
+        with self.__lock:
+            self.in_flight -= 1
+            waiters, self.__waiters = self.__waiters, []
+        # 完了はワーカー側のスレッドで通知されるため、待機しているイベントループ上で再開させます
+        # 再開した呼び出し元は空きを確認し直し、空いていなければ再び待機します
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(self.__wake, waiter)
+
+    @staticmethod
+    def __wake(waiter: asyncio.Future):
+        # 待機中に切断された場合はキャンセル済みのため何もしません
+        if not waiter.done():
+            waiter.set_result(None)
+
+    def prewarm(self):
+        """プロセスの場合はすべてのワーカーを起動し、initializerを実行しておきます。
+        """
+        if self.pool_type != PROCESS:
+            return
+        executor = self.__get_executor()
+        for _ in range(self.pool_size):
+            executor.submit(int)
+
+    def stats(self) -> dict[str, Any]:
+        """プールの状態を返却します
+
+        Returns:
+            dict[str, Any]: 統計情報
+        """
+        return {
+            "type": self.pool_type,
+            "size": self.pool_size,
+            "queue_size": self.queue_size,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=False, cancel_futures=True)
+            self.__executor = None
+
@@ -0,0 +1,237 @@
+from fastapi import HTTPException, Request, Response
+from fastapi.routing import APIRoute
+from collections import Counter
+from contextvars import ContextVar
+from lib.lru_cache import LRUCache
+from pydantic import BaseModel
+from typing import Any, Callable, Coroutine, Optional
+import threading
+import asyncio
+import cProfile
+import marshal
+import hmac
+import time
+import uuid
+import sys
+import os
+
+# 未設定の場合はプロファイルを行いません
+TOKEN = os.getenv("PROFILE_TOKEN", "")
+SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", 0.005))
+# 保持するプロファイル結果の件数
+STORE_SIZE = int(os.getenv("PROFILE_STORE_SIZE", 32))
+
+# プロファイルを指定するヘッダーとクエリ。値はSAMPLEかCPROFILEで、空の場合はSAMPLEです
+MODE_HEADER = "X-Profile"
+MODE_QUERY = "_profile"
+TOKEN_HEADER = "X-Profile-Token"
+ID_HEADER = "X-Profile-Id"
+
+# 全スレッドのスタックを定期的に取得し、flamegraph用のcollapsed stacksを返却します
+SAMPLE = "sample"
+# イベントループのスレッドをcProfileで計測し、pstatsの形式で返却します
+CPROFILE = "cprofile"
+
+MEDIA_TYPES = {
+    SAMPLE: "text/plain",
+    CPROFILE: "application/octet-stream",
+}
+
+# 待機中のスレッドのスタックは結果に含めません
+IDLE_FILES = ("threading.py", "queue.py", "selectors.py", os.path.join("concurrent", "futures", "thread.py"))
+
+# プロファイル中のリクエストであればTrueです。キャッシュを使わずに生成させるために利用します
+ACTIVE: ContextVar[bool] = ContextVar("request_profiler_active", default=False)
+
+
+class ProfileResult(BaseModel):
+    id: str
+    mode: str
+    path: str
+    seconds: float
+    data: bytes
+
+
+PROFILES = LRUCache(max_weight=STORE_SIZE)
+
+# cProfileは同時に1つしか有効にできないため、プロファイルは1リクエストずつ行います
+__lock = asyncio.Lock()
+
+
+class SamplingProfiler:
+    """一定間隔で全スレッドのスタックを取得するプロファイラーです。
+    描画プールやサブレイヤーのスレッドも含まれますが、同時に処理している他のリクエストも含まれます。
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL) -> None:
+        self.interval = interval
+        self.samples: Counter[str] = Counter()
+        self.__stop = threading.Event()
+        self.__thread = threading.Thread(target=self.__run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self.__thread.start()
+
+    def stop(self):
+        self.__stop.set()
+        self.__thread.join()
+
+    def __run(self):
+        names = {}
+        while not self.__stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == self.__thread.ident or frame.f_code.co_filename.endswith(IDLE_FILES):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{code.co_firstlineno}")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> bytes:
+        """flamegraph.plやspeedscopeで読み込めるcollapsed stacksを返却します
+
+        Returns:
+            bytes: 1行に1つのスタックとサンプル数
+        """
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common()).encode()
+
+
+def requested_mode(request: Request) -> Optional[str]:
+    """リクエストで指定されたプロファイルの種類を返却します。
+    指定がある場合は、種類を確認する前に管理者トークンを確認します。
+
+    Args:
+        request (Request): リクエスト
+
+    Raises:
+        HTTPException: トークンが正しくない場合に403、種類が正しくない場合に400をraiseします
+
+    Returns:
+        Optional[str]: SAMPLEかCPROFILE。指定がない場合はNone
+    """
+    mode = request.headers.get(MODE_HEADER)
+    if mode is None:
+        mode = request.query_params.get(MODE_QUERY)
+    if mode is None:
+        return None
+    # プロファイラーの存在や種類がトークンなしで分からないよう、先にトークンを確認します
+    check_token(request)
+    mode = mode or SAMPLE
+    if mode not in MEDIA_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"profile mode {mode} is not found. ({', '.join(MEDIA_TYPES.keys())})",
+        )
+    return mode
+
+
+def check_token(request: Request):
+    """管理者トークンを確認します
+
+    Args:
+        request (Request): リクエスト
+
+    Raises:
+        HTTPException: トークンが未設定か一致しない場合に403をraiseします
+    """
+    token = request.headers.get(TOKEN_HEADER, "")
+    if not TOKEN or not hmac.compare_digest(token.encode(), TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="profile token is invalid.")
+
+
+async def run_profiled(
+    mode: str,
+    handler: Callable[[Request], Coroutine[Any, Any, Response]],
+    request: Request,
+) -> Response:
+    """プロファイラーを有効にしてリクエストを処理し、結果をPROFILESに保存します
+
+    Args:
+        mode (str): SAMPLEかCPROFILE
+        handler (Callable[[Request], Coroutine[Any, Any, Response]]): ルートの処理
+        request (Request): リクエスト
+
+    Raises:
+        HTTPException: 他のリクエストをプロファイル中の場合に409をraiseします
+
+    Returns:
+        Response: X-Profile-Idヘッダーを追加したレスポンス
+    """
+    if __lock.locked():
+        raise HTTPException(status_code=409, detail="another request is being profiled.")
+    async with __lock:
+        active = ACTIVE.set(True)
+        start = time.perf_counter()
+        try:
+            if mode == CPROFILE:
+                profiler = cProfile.Profile()
+                profiler.enable()
+                try:
+                    response = await handler(request)
+                finally:
+                    profiler.disable()
+                profiler.create_stats()
+                data = marshal.dumps(profiler.stats)
+            else:
+                profiler = SamplingProfiler()
+                profiler.start()
+                try:
+                    response = await handler(request)
+                finally:
+                    profiler.stop()
+                data = profiler.collapsed()
+        finally:
+            ACTIVE.reset(active)
+
+    result = ProfileResult(
+        id=uuid.uuid4().hex,
+        mode=mode,
+        path=request.url.path,
+        seconds=time.perf_counter() - start,
+        data=data,
+    )
+    PROFILES.put(result.id, result)
+    response.headers[ID_HEADER] = result.id
+    return response
+
+
+class ProfilingRoute(APIRoute):
+    """X-Profileヘッダーか_profileクエリが指定されたリクエストのみ、プロファイラーを有効にして処理するルートです。
+    結果はPROFILESに保存し、そのIDをX-Profile-Idヘッダーで返却します。
+    StreamingResponseの場合、計測されるのはレスポンスを返却するまでの処理のみです。
+    描画プールがprocessの場合、描画処理はワーカープロセスで行われるため計測されません。
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+
+        async def profiling_route_handler(request: Request) -> Response:
+            mode = requested_mode(request)
+            if mode is None:
+                return await handler(request)
+            return await run_profiled(mode, handler, request)
+
+        return profiling_route_handler
+
+
+def get_result(profile_id: str) -> ProfileResult:
+    """保存されたプロファイル結果を取得します
+
+    Args:
+        profile_id (str): X-Profile-Idヘッダーで返却されたID
+
+    Raises:
+        HTTPException: 存在しない場合に404をraiseします
+
+    Returns:
+        ProfileResult: プロファイル結果
+    """
+    result = PROFILES.get(profile_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"profile {profile_id} is not found.")
+    return result
@@ -0,0 +1,72 @@
+from typing import Any, Awaitable, Callable, Hashable
+import asyncio
+
+SINGLE_FLIGHTS: dict[str, "SingleFlight"] = {}
+
+
+class SingleFlight:
+    """同じキーの処理が実行中の場合は新たに実行せず、実行中の処理の結果を共有します。
+    処理は呼び出し元とは別のタスクで実行するため、最初の呼び出し元が切断されても他の呼び出し元には結果が返却されます。
+    イベントループ上でのみ利用してください。
+    """
+
+    def __init__(self, name: str) -> None:
+        """コンストラクタです。生成したインスタンスはSINGLE_FLIGHTSに登録されます。
+
+        Args:
+            name (str): 統計情報に表示する名前
+        """
+        self.name = name
+        self.__tasks: dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+        SINGLE_FLIGHTS[name] = self
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """keyの処理が実行中であればその結果を待ち、なければfuncを実行します。
+        funcが例外をraiseした場合は、待機していたすべての呼び出し元に同じ例外をraiseします。
+
+        Args:
+            key (Hashable): 処理を識別するキー
+            func (Callable[[], Awaitable[Any]]): 実行する処理
+
+        Returns:
+            Any: funcの戻り値
+        """
+        task = self.__tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self.__tasks[key] = task
+            task.add_done_callback(lambda t: self.__done(key, t))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def __done(self, key: Hashable, task: asyncio.Task):
+        if self.__tasks.get(key) is task:
+            del self.__tasks[key]
+        # 待機している呼び出し元がいない場合に、例外が取得されなかった旨の警告が出ないようにします
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict[str, int]:
+        """統計情報を返却します
+
+        Returns:
+            dict[str, int]: 統計情報
+        """
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self.__tasks),
+        }
+
+
+def stats() -> dict[str, dict[str, int]]:
+    """SingleFlightごとの統計情報を返却します
+
+    Returns:
+        dict[str, dict[str, int]]: 名前と統計情報
+    """
+    return {name: flight.stats() for name, flight in SINGLE_FLIGHTS.items()}
@@ -0,0 +1,81 @@
+from typing import AsyncIterator
+import lib.image_encoder as image_encoder
+import zipfile
+import io
+import os
+
+ZIP = "zip"
+MULTIPART = "multipart"
+
+MEDIA_TYPES = {
+    ZIP: "application/zip",
+    MULTIPART: "multipart/mixed",
+}
+
+
+class ChunkWriter(io.RawIOBase):
+    """書き込まれたbytesを溜めておき、取り出すたびに破棄する書き込み先です。
+    seekできないため、zipfileはファイルごとのサイズを後ろに書き込みます。
+    """
+
+    def __init__(self) -> None:
+        self.__chunks: list[bytes] = []
+        self.__position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self.__chunks.append(bytes(b))
+        self.__position += len(b)
+        return len(b)
+
+    def tell(self) -> int:
+        return self.__position
+
+    def pop(self) -> bytes:
+        data = b"".join(self.__chunks)
+        self.__chunks.clear()
+        return data
+
+
+async def zip_stream(files: AsyncIterator[tuple[str, bytes]]) -> AsyncIterator[bytes]:
+    """ファイルを受け取るたびにzipの一部を返却します。
+    保持するのは書き込み中の1ファイル分と、セントラルディレクトリのみです。
+
+    Args:
+        files (AsyncIterator[tuple[str, bytes]]): ファイル名とbytes
+
+    Yields:
+        bytes: zipの一部
+    """
+    writer = ChunkWriter()
+    # 画像は圧縮済みのため、zipでは圧縮しません
+    with zipfile.ZipFile(writer, mode="w", compression=zipfile.ZIP_STORED) as zip_file:
+        async for filename, data in files:
+            zip_file.writestr(filename, data)
+            yield writer.pop()
+    yield writer.pop()
+
+
+async def multipart_stream(files: AsyncIterator[tuple[str, bytes]], boundary: str) -> AsyncIterator[bytes]:
+    """ファイルを受け取るたびにmultipart/mixedの1パートを返却します。
+
+    Args:
+        files (AsyncIterator[tuple[str, bytes]]): ファイル名とbytes
+        boundary (str): パートの区切り文字列
+
+    Yields:
+        bytes: multipartの一部
+    """
+    async for filename, data in files:
+        content_type = image_encoder.MEDIA_TYPES.get(os.path.splitext(filename)[1], "application/octet-stream")
+        headers = (
+            f"--{boundary}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f'Content-Disposition: attachment; filename="{filename}"\r\n'
+            f"Content-Length: {len(data)}\r\n"
+            "\r\n"
+        )
+        yield headers.encode() + data + b"\r\n"
+    yield f"--{boundary}--\r\n".encode()
@@ -0,0 +1,137 @@
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from threading import Lock, local
+from typing import Any, Callable
+import os
+
+# 背景、ステータス、聖遺物などのパーツを並列に生成するスレッド数
+POOL_SIZE = int(os.getenv("SUBLAYER_POOL_SIZE", min(32, (os.cpu_count() or 1) + 4)))
+# 待機できるタスク数。超えた場合は呼び出し元のスレッドで実行します
+QUEUE_SIZE = int(os.getenv("SUBLAYER_QUEUE_SIZE", POOL_SIZE * 8))
+
+
+class SubLayerExecutor:
+    """画像のパーツ生成を行う、全ジェネレーターで共有するスレッドプールです。
+    ワーカースレッド上から投入されたタスクや、待機数が上限を超えたタスクは呼び出し元で実行するため、
+    ネストした投入でワーカーが埋まりデッドロックすることはありません。
+    """
+
+    def __init__(self, pool_size: int = POOL_SIZE, queue_size: int = QUEUE_SIZE) -> None:
+        """コンストラクタです。
+
+        Args:
+            pool_size (int, optional): ワーカー数. Defaults to POOL_SIZE.
+            queue_size (int, optional): 待機できるタスク数. Defaults to QUEUE_SIZE.
+        """
+        self.pool_size = pool_size
+        self.queue_size = queue_size
+        self.submitted = 0
+        self.inline_nested = 0
+        self.inline_saturated = 0
+        self.pending = 0
+        self.max_pending = 0
+        self.__executor = ThreadPoolExecutor(
+            max_workers=pool_size,
+            thread_name_prefix="sublayer",
+            initializer=self.__mark_worker,
+        )
+        self.__local = local()
+        self.__lock = Lock()
+
+    def __mark_worker(self):
+        self.__local.is_worker = True
+
+    def __run_inline(self, fn: Callable, *args: Any, **kwargs: Any) -> Future:
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+    def __release(self, *_):
+        with self.__lock:
+            self.pending -= 1
+
+    def submit(self, fn: Callable, *args: Any, **kwargs: Any) -> Future:
+        """タスクを投入します。ThreadPoolExecutor.submitと同じように利用できます。
+
+        Args:
+            fn (Callable): 実行する関数
+            *args (Any): 関数の引数
+            **kwargs (Any): 関数のキーワード引数
+
+        Returns:
+            Future: 実行結果
+        """
+        # ワーカー上で子タスクの完了を待つとワーカーが枯渇するため、そのまま実行します
+        if getattr(self.__local, "is_worker", False):
+            with self.__lock:
+                self.inline_nested += 1
+            return self.__run_inline(fn, *args, **kwargs)
+        with self.__lock:
+            if self.pending >= self.pool_size + self.queue_size:
+                self.inline_saturated += 1
+                saturated = True
+            else:
+                saturated = False
+                self.submitted += 1
+                self.pending += 1
+                self.max_pending = max(self.max_pending, self.pending)
+        if saturated:
+            return self.__run_inline(fn, *args, **kwargs)
+        try:
+            future = self.__executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self.__release()
+            raise
+        future.add_done_callback(self.__release)
+        return future
+
+    def scope(self) -> "SubLayerScope":
+        """withブロックを抜ける際にブロック内で投入したタスクの完了を待つスコープを返却します。
+        `with ThreadPoolExecutor() as pool:` と同じ形で利用できます。
+
+        Returns:
+            SubLayerScope: スコープ
+        """
+        return SubLayerScope(self)
+
+    def stats(self) -> dict[str, int]:
+        """統計情報を返却します
+
+        Returns:
+            dict[str, int]: 統計情報
+        """
+        with self.__lock:
+            return {
+                "size": self.pool_size,
+                "queue_size": self.queue_size,
+                "submitted": self.submitted,
+                "inline_nested": self.inline_nested,
+                "inline_saturated": self.inline_saturated,
+                "pending": self.pending,
+                "max_pending": self.max_pending,
+            }
+
+
+class SubLayerScope:
+    """SubLayerExecutor.scopeで利用するスコープです。
+    """
+
+    def __init__(self, executor: SubLayerExecutor) -> None:
+        self.executor = executor
+        self.futures: list[Future] = []
+
+    def submit(self, fn: Callable, *args: Any, **kwargs: Any) -> Future:
+        future = self.executor.submit(fn, *args, **kwargs)
+        self.futures.append(future)
+        return future
+
+    def __enter__(self) -> "SubLayerScope":
+        return self
+
+    def __exit__(self, *_) -> None:
+        wait(self.futures)
+
+
+SUBLAYER_EXECUTOR = SubLayerExecutor()
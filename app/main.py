@@ -3,15 +3,36 @@ import controller.image_controller as image_ctrl
 import controller.status_controller as status_ctrl
 import controller.util_controller as util_ctrl
 import controller.ranking_controller as ranking_ctrl
+import controller.metrics_controller as metrics_ctrl
 import event.dataupdate as dataupdate
+import event.prewarm as prewarm
+import service.render_service as render_service
+from lib.redis_status_cache import STATUS_CACHE
 
 dataupdate.json_update_observation_start()
+prewarm.layer_prewarm_start()
 
 
 app = FastAPI()
 
 
+@app.on_event("startup")
+def prewarm_render_pool():
+    render_service.RENDER_POOL.prewarm()
+
+
+@app.on_event("shutdown")
+def shutdown_render_pool():
+    render_service.RENDER_POOL.shutdown()
+
+
+@app.on_event("shutdown")
+async def close_status_cache():
+    await STATUS_CACHE.close()
+
+
 app.include_router(image_ctrl.router)
 app.include_router(status_ctrl.router)
 app.include_router(util_ctrl.router)
 app.include_router(ranking_ctrl.router)
+app.include_router(metrics_ctrl.router)
@@ -107,3 +107,5 @@ class Enka(BaseModel):
     playerInfo: PlayerInfo
     avatarInfoList: list[AvatarInfo] = []
     uid: int
+    # enka側でデータが更新されるまでの秒数
+    ttl: Optional[int] = None
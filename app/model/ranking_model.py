@@ -3,8 +3,7 @@ from typing import Optional
 from decimal import Decimal
 import service.score_calc as score_calc
 import model.util_model as util_model
-from repository.util_repository import \
-    CHARACTER_DATA_DICT, WEAPON_DATA_DICT, ARTIFACT_DATA_DICT, STATUS_NAMEHASH_DICT
+import repository.util_repository as util_repository
 
 ELEMENTAL_NAME_DICT = {
     "Physics": "物理ダメージ",
@@ -24,11 +23,11 @@ class Artifact(BaseModel):
     util: Optional[util_model.Artifact] = None
 
     def set_util(self):
-        self.util = ARTIFACT_DATA_DICT[self.icon_name]
+        self.util = util_repository.ARTIFACT_DATA_DICT[self.icon_name]
 
     @property
     def main_jp_name(self):
-        return STATUS_NAMEHASH_DICT[self.main_name]
+        return util_repository.STATUS_NAMEHASH_DICT[self.main_name]
 
 
 class Weapon(BaseModel):
@@ -40,10 +39,10 @@ class Weapon(BaseModel):
 
     @property
     def sub_jp_name(self):
-        return STATUS_NAMEHASH_DICT[self.sub_name]
+        return util_repository.STATUS_NAMEHASH_DICT[self.sub_name]
 
     def set_util(self):
-        self.util = WEAPON_DATA_DICT[self.icon_name]
+        self.util = util_repository.WEAPON_DATA_DICT[self.icon_name]
 
 
 class Skill(BaseModel):
@@ -89,7 +88,7 @@ class Character(BaseModel):
         return ELEMENTAL_NAME_DICT.get(self.elemental_name)
 
     def init_utils(self):
-        self.util = CHARACTER_DATA_DICT[self.id]
+        self.util = util_repository.CHARACTER_DATA_DICT[self.id]
         self.costume = self.util.costumes[self.costume_id]
         for v in self.artifacts.values():
             v.set_util()
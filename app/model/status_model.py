@@ -3,8 +3,7 @@ from typing import Optional
 from decimal import Decimal
 import service.score_calc as score_calc
 import model.util_model as util_model
-from repository.util_repository import \
-    CHARACTER_DATA_DICT, WEAPON_DATA_DICT, ARTIFACT_DATA_DICT, STATUS_NAMEHASH_DICT, NAMECARD_DATA_DICT, PFPS_DICT
+import repository.util_repository as util_repository
 
 
 ELEMENTAL_NAME_DICT = {
@@ -39,7 +38,7 @@ class ArtifactStatus(BaseModel):
 
     @property
     def jp_name(self):
-        return STATUS_NAMEHASH_DICT[self.name]
+        return util_repository.STATUS_NAMEHASH_DICT[self.name]
 
     @property
     def value_str(self):
@@ -61,11 +60,11 @@ class Artifact(BaseModel):
     util: Optional[util_model.Artifact] = None
 
     def set_util(self):
-        self.util = ARTIFACT_DATA_DICT[self.icon_name]
+        self.util = util_repository.ARTIFACT_DATA_DICT[self.icon_name]
 
     @property
     def main_jp_name(self):
-        return STATUS_NAMEHASH_DICT[self.main_name]
+        return util_repository.STATUS_NAMEHASH_DICT[self.main_name]
 
     @property
     def main_value_str(self):
@@ -94,14 +93,14 @@ class Weapon(BaseModel):
 
     @property
     def main_jp_name(self):
-        return STATUS_NAMEHASH_DICT[self.main_name]
+        return util_repository.STATUS_NAMEHASH_DICT[self.main_name]
 
     @property
     def sub_jp_name(self):
-        return STATUS_NAMEHASH_DICT[self.sub_name]
+        return util_repository.STATUS_NAMEHASH_DICT[self.sub_name]
 
     def set_util(self):
-        self.util = WEAPON_DATA_DICT[self.icon_name]
+        self.util = util_repository.WEAPON_DATA_DICT[self.icon_name]
 
 
 class Skill(BaseModel):
@@ -138,6 +137,9 @@ class Character(BaseModel):
     create_date: str
     costume_id: str = "defalut"
     build_type: Optional[str] = None
+    # ビルドタイプごとの聖遺物の合計スコアと、その中で最も高いビルドタイプ
+    build_scores: Optional[dict[str, Decimal]] = None
+    recommended_build_type: Optional[str] = None
     costume: Optional[util_model.Costume] = None
     util: Optional[util_model.JpCharacterModel] = None
 
@@ -154,7 +156,7 @@ class Character(BaseModel):
         return ELEMENTAL_NAME_DICT.get(self.elemental_name)
 
     def init_utils(self):
-        self.util = CHARACTER_DATA_DICT[self.id]
+        self.util = util_repository.CHARACTER_DATA_DICT[self.id]
         self.costume = self.util.costumes[self.costume_id]
         self.weapon.set_util()
         for artifact in self.artifacts.values():
@@ -162,7 +164,19 @@ class Character(BaseModel):
         for skill, util_skill in zip(self.skills, self.util.skills):
             skill.set_util(util_skill)
 
+    def init_build_scores(self):
+        """すべてのビルドタイプの合計スコアを計算し、おすすめのビルドタイプとともにsetします
+        """
+        self.build_scores = score_calc.calc_build_scores(self.artifacts.values())
+        self.recommended_build_type = score_calc.recommend_build_type(self.build_scores)
+
     def init_score(self):
+        scores = score_calc.calc_artifact_scores(self.artifacts.values())
+        if scores is not None and self.build_type in scores:
+            for artifact, score in zip(self.artifacts.values(), scores[self.build_type]):
+                artifact.score = score_calc.to_decimal(score)
+            return
+
         calc = score_calc.ScoreCalc(self.build_type)
         for artifact in self.artifacts.values():
             artifact.set_calc_score(calc)
@@ -175,9 +189,9 @@ class ProfilePicture(BaseModel):
     @property
     def avatar_icon(self):
         if self.pfps_id == None:
-            return CHARACTER_DATA_DICT[self.id].costumes[self.costume_id].avatar_icon
+            return util_repository.CHARACTER_DATA_DICT[self.id].costumes[self.costume_id].avatar_icon
         else:
-            return PFPS_DICT[self.pfps_id].icon
+            return util_repository.PFPS_DICT[self.pfps_id].icon
 
 class UserData(BaseModel):
     uid: int
@@ -196,4 +210,4 @@ class UserData(BaseModel):
     profile_picture: ProfilePicture
 
     def set_namecard(self):
-        self.name_card = NAMECARD_DATA_DICT[str(self.name_card_id)]
\ No newline at end of file
+        self.name_card = util_repository.NAMECARD_DATA_DICT[str(self.name_card_id)]
\ No newline at end of file
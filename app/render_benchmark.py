@@ -0,0 +1,330 @@
+"""4種類の画像生成をサーバーを起動せずに実行し、処理時間とピークメモリを計測します。
+enkaの画像とフォントが無い環境でも動くよう、作業ディレクトリに代わりの画像を生成して実行します。
+正解画像との比較はtests/test_render_golden.pyで行います。
+
+appディレクトリで実行してください。
+    python render_benchmark.py
+
+主なオプション
+    --repeat N        1つの入力を生成する回数. Defaults to 3.
+    --font PATH       フォントが無い場合に代わりに利用するttf
+    --work-dir DIR    代わりの画像を生成する作業ディレクトリ
+    --real-assets     代わりの画像を生成せず、appディレクトリの画像とフォントで実行します
+"""
+import argparse
+import ast
+import copy
+import hashlib
+import json
+import os
+import random
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.abspath(os.path.dirname(__file__))
+ROOT_DIR = os.path.dirname(APP_DIR)
+
+USER_FIXTURES = [
+    os.path.join(ROOT_DIR, "response_1687156408314.json"),
+    os.path.join(ROOT_DIR, "response_test.json"),
+]
+RANKING_FIXTURE = os.path.join(APP_DIR, "ranking_test.json")
+
+FONT_PATH = "font/ja-jp.ttf"
+FONT_CANDIDATES = [
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/Library/Fonts/Arial Unicode.ttf",
+    "C:/Windows/Fonts/meiryo.ttc",
+]
+
+def load_user_fixtures(path: str) -> list[dict]:
+    """ユーザーデータのフィクスチャを読み込みます。
+    jsonのほか、ログに出力したdictのreprが並んだファイルにも対応します。
+
+    Args:
+        path (str): ファイルのパス
+
+    Returns:
+        list[dict]: ユーザーデータのdict
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    try:
+        return [json.loads(text)]
+    except json.JSONDecodeError:
+        pass
+
+    users = []
+    lines = text.split("\n")
+    starts = [i for i, line in enumerate(lines) if line.startswith("{'uid'")]
+    for start in starts:
+        # dictのreprが終わる行まで広げながら評価します
+        for end in range(start + 1, len(lines) + 1):
+            try:
+                users.append(ast.literal_eval("\n".join(lines[start:end])))
+                break
+            except (SyntaxError, ValueError):
+                continue
+    return users
+
+
+def stand_in(path: str, size: tuple[int, int]):
+    """存在しない画像の代わりに、パスから決まる色の画像を生成します。
+
+    Args:
+        path (str): 画像のパス
+        size (tuple[int, int]): 画像のサイズ
+    """
+    from PIL import Image
+
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    rnd = random.Random(path)
+    im = Image.new("RGBA", size, (rnd.randrange(256), rnd.randrange(256), rnd.randrange(256), 255))
+    # 透過の処理も通るよう、一部を透明にします
+    for i in range(0, size[0], 7):
+        im.putpixel((i, (i * 3) % size[1]), (0, 0, 0, 0))
+    im.save(path)
+
+
+def find_font(font: str = None) -> str:
+    """代わりに利用するフォントを探します。指定されたフォント、appディレクトリのフォント、FONT_CANDIDATESの順に探します。
+
+    Args:
+        font (str, optional): 代わりに利用するフォント. Defaults to None.
+
+    Raises:
+        FileNotFoundError: フォントが見つからない場合にraiseします
+
+    Returns:
+        str: フォントのパス
+    """
+    candidates = [font, os.path.join(APP_DIR, FONT_PATH)] + FONT_CANDIDATES
+    found = next((v for v in candidates if v and os.path.exists(v)), None)
+    if found is None:
+        raise FileNotFoundError("フォントが見つかりません。--fontでttfを指定してください")
+    return found
+
+
+def prepare_work_dir(work_dir: str, font: str = None):
+    """作業ディレクトリにdataと同梱の画像をリンクし、enkaの画像とフォントの代わりを用意します。
+
+    Args:
+        work_dir (str): 作業ディレクトリ
+        font (str, optional): 代わりに利用するフォント. Defaults to None.
+
+    Raises:
+        FileNotFoundError: フォントが見つからない場合にraiseします
+    """
+    os.makedirs(os.path.join(work_dir, "image"), exist_ok=True)
+    for src, dst in [("data", "data"), ("image/assets", "image/assets")]:
+        dst = os.path.join(work_dir, dst)
+        if not os.path.exists(dst):
+            os.symlink(os.path.join(APP_DIR, src), dst)
+    for directory in ["build_images", "profile_images", "ranking_images", "font"]:
+        os.makedirs(os.path.join(work_dir, directory), exist_ok=True)
+
+    font_path = os.path.join(work_dir, FONT_PATH)
+    if not os.path.exists(font_path):
+        shutil.copy(find_font(font), font_path)
+
+    cwd = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        with open("data/characters.json", "r", encoding="utf-8") as f:
+            characters = json.load(f)
+        for character in characters.values():
+            for costume in character["costumes"].values():
+                stand_in(costume["gacha_icon"]["path"], (2048, 1024))
+                stand_in(costume["avatar_icon"]["path"], (256, 256))
+                stand_in(costume["side_icon"]["path"], (128, 128))
+            for skill in character["skills"]:
+                stand_in(skill["icon"]["path"], (128, 128))
+            for constellation in character["consts"]:
+                stand_in(constellation["path"], (128, 128))
+        for name, size in [
+            ("weapons.json", (256, 256)),
+            ("artifacts.json", (256, 256)),
+            ("namecards.json", (840, 400)),
+            ("pfps.json", (256, 256)),
+        ]:
+            with open(f"data/{name}", "r", encoding="utf-8") as f:
+                for v in json.load(f).values():
+                    stand_in(v["icon"]["path"], size)
+    finally:
+        os.chdir(cwd)
+
+
+def reset_peak_memory() -> bool:
+    """Linuxの場合はピークメモリ(VmHWM)を現在の値にリセットします
+
+    Returns:
+        bool: リセットできた場合はTrue
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def read_memory() -> tuple[int, int]:
+    """現在のメモリ使用量とピークをKBで返却します
+
+    Returns:
+        tuple[int, int]: VmRSSとVmHWM
+    """
+    values = {}
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("VmRSS", "VmHWM"):
+                    values[key] = int(value.split()[0])
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak, peak
+    return values["VmRSS"], values["VmHWM"]
+
+
+def pixel_digest(image) -> str:
+    """画像のモード、サイズ、画素から正解画像と比較するためのハッシュを生成します
+
+    Args:
+        image (Image.Image): 生成した画像
+
+    Returns:
+        str: sha256の16進数
+    """
+    h = hashlib.sha256(f"{image.mode}:{image.width}x{image.height}:".encode())
+    h.update(image.tobytes())
+    return h.hexdigest()
+
+
+def perceptual_diff(image, golden) -> tuple[float, float]:
+    """2つの画像を元の解像度のまま、すべてのチャンネルで比較します
+
+    Args:
+        image (Image.Image): 生成した画像
+        golden (Image.Image): 正解画像
+
+    Returns:
+        tuple[float, float]: 差分の平均(0-255)と、差分が16を超える値の割合(%)
+    """
+    from PIL import ImageChops
+
+    if image.size != golden.size:
+        return 255.0, 100.0
+    mode = "RGBA" if "A" in image.getbands() + golden.getbands() else "RGB"
+    histogram = ImageChops.difference(image.convert(mode), golden.convert(mode)).histogram()
+    total = sum(histogram)
+    mean = sum(i % 256 * v for i, v in enumerate(histogram)) / total
+    # histogramはチャンネルごとに256個並んでいます
+    over = sum(v for i, v in enumerate(histogram) if i % 256 > 16) / total * 100
+    return mean, over
+
+
+def build_cases() -> list[tuple[str, str, object]]:
+    """計測する入力を作成します。画像生成のモジュールは作業ディレクトリに移動した後にimportします。
+
+    Returns:
+        list[tuple[str, str, object]]: 生成元の名前、入力の名前、入力を生成して画像を返却する関数
+    """
+    from pydantic import ValidationError
+    import model.status_model as status_model
+    import model.ranking_model as ranking_model
+    import service.gen_genshin_image as gen_genshin_image
+    import service.gen_genshin_image_by_artifacter as gen_artifacter_image
+    import service.gen_profile_image as gen_profile_image
+    import service.gen_ranking_user_image as gen_ranking_user_image
+
+    cases = []
+    for path in USER_FIXTURES:
+        if not os.path.exists(path):
+            continue
+        for i, user in enumerate(load_user_fixtures(path)):
+            fixture = f"{os.path.splitext(os.path.basename(path))[0]}_{i}"
+            # 武器のレアリティが追加される前のログには含まれないため、補って利用します
+            for character in user["characters"]:
+                character["weapon"].setdefault("rarity", 4)
+            try:
+                status_model.UserData(**copy.deepcopy(user))
+            except ValidationError as e:
+                # 古いモデルで出力されたものは現在のモデルで読み込めないため除外します
+                print(f"skip {fixture}: {len(e.errors())} validation errors")
+                continue
+            cases.append((
+                "profile", fixture,
+                lambda user=user: gen_profile_image.get_profile_image(status_model.UserData(**copy.deepcopy(user))),
+            ))
+            for character in user["characters"]:
+                character = dict(character, build_type=character.get("build_type") or "atk")
+                name = f"{fixture}_{character['id']}"
+                cases.append((
+                    "genshin", name,
+                    lambda c=character: gen_genshin_image.get_character_image(status_model.Character(**copy.deepcopy(c))),
+                ))
+                cases.append((
+                    "artifacter", name,
+                    lambda c=character: gen_artifacter_image.get_character_image(status_model.Character(**copy.deepcopy(c))),
+                ))
+    with open(RANKING_FIXTURE, "r", encoding="utf-8") as f:
+        ranking = json.load(f)
+    cases.append((
+        "ranking", "ranking_test",
+        lambda: gen_ranking_user_image.get_character_image(ranking_model.RankingData(**copy.deepcopy(ranking))),
+    ))
+    return cases
+
+
+def main(args: argparse.Namespace) -> int:
+    if args.real_assets:
+        work_dir = APP_DIR
+    else:
+        work_dir = args.work_dir or os.path.join(tempfile.gettempdir(), "genshin_render_benchmark")
+        prepare_work_dir(work_dir, args.font)
+    os.chdir(work_dir)
+    sys.path.insert(0, APP_DIR)
+
+    results: dict[str, list[tuple[float, float]]] = {}
+    for generator, fixture, render in build_cases():
+        times = []
+        peak = 0
+        for _ in range(args.repeat):
+            can_reset = reset_peak_memory()
+            rss_before, _ = read_memory()
+            start = time.perf_counter()
+            render()
+            times.append((time.perf_counter() - start) * 1000)
+            _, hwm = read_memory()
+            if can_reset:
+                peak = max(peak, hwm - rss_before)
+        results.setdefault(generator, []).append((statistics.median(times), peak / 1024))
+
+    print(f"{'generator':<12}{'件数':>6}{'中央値(ms)':>14}{'最大(ms)':>12}{'ピーク(MB)':>14}")
+    for generator, rows in results.items():
+        print(
+            f"{generator:<12}{len(rows):>6}"
+            f"{statistics.median(v[0] for v in rows):>14.1f}"
+            f"{max(v[0] for v in rows):>12.1f}"
+            f"{max(v[1] for v in rows):>14.1f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--font")
+    parser.add_argument("--work-dir")
+    parser.add_argument("--real-assets", action="store_true")
+    sys.exit(main(parser.parse_args()))
@@ -2,6 +2,7 @@ import lib.downloader as downloader
 from aiohttp import client_exceptions
 from fastapi import HTTPException
 from model.enka_model import Enka
+import lib.metrics as metrics
 
 
 MESSAGES = {
@@ -22,7 +23,11 @@ CHANGE_STATUS_CODE = {
     503: 440,
 }
 
+# enkaが4xxを返した場合のステータスコードです。しばらくは同じ結果になるため短時間キャッシュできます
+CLIENT_ERROR_STATUS_CODES = {v for k, v in CHANGE_STATUS_CODE.items() if 400 <= k < 500}
 
+
+@metrics.timed(metrics.OPERATION_SECONDS, "enka_fetch")
 async def get_enka_model(uid: int):
     try:
         data = await downloader.json_download(
@@ -0,0 +1,143 @@
+from fastapi import HTTPException
+from lib.image_encoder import EncodeProfile
+from typing import AsyncIterator, Optional
+import service.render_service as render_service
+import service.image_cache_service as image_cache_service
+import model.status_model as status_model
+import lib.cache_image as cache_image
+import lib.image_encoder as image_encoder
+import asyncio
+import os
+
+DEFAULT_BUILD_TYPE = "atk"
+# 1つのバッチで同時に保持する画像の枚数。生成中のものと、送信を待っているものの合計です
+MAX_IN_FLIGHT = int(os.getenv("BATCH_RENDER_IN_FLIGHT", 2))
+
+
+def check_gen_type(gen_type: int):
+    """gen_typeが存在するか確認します。ストリーミングではレスポンスの開始後にエラーを返せないため、事前に確認します。
+
+    Args:
+        gen_type (int): 0: GenshinStatus, 1: Artifacter
+
+    Raises:
+        HTTPException: gen_typeが存在しない場合に404をraiseします
+    """
+    if gen_type not in render_service.CHARACTER_GENERATORS:
+        raise HTTPException(status_code=404, detail=f"gen_type {gen_type} is not found.")
+
+
+def character_filename(character: status_model.Character, gen_type: int, ext: str) -> str:
+    """キャラクターのビルド画像のダウンロード時のファイル名を返却します
+
+    Args:
+        character (status_model.Character): キャラクターデータ
+        gen_type (int): 0: GenshinStatus, 1: Artifacter
+        ext (str): 拡張子
+
+    Returns:
+        str: ファイル名
+    """
+    return f"{character.create_date}_{character.uid}_{character.id}_{character.build_type}_{gen_type}{ext}"
+
+
+def character_file_path(character: status_model.Character, gen_type: int, profile: EncodeProfile, ext: str) -> str:
+    """キャラクターのビルド画像の保存先を返却します。
+    create_dateが異なっても同じビルドであれば同じ保存先になります。
+
+    Args:
+        character (status_model.Character): キャラクターデータ
+        gen_type (int): 0: GenshinStatus, 1: Artifacter
+        profile (EncodeProfile): エンコード設定
+        ext (str): 拡張子
+
+    Returns:
+        str: 画像の保存先
+    """
+    return f"build_images/{cache_image.render_key(character, gen_type)}_{profile.name}{ext}"
+
+
+async def get_character_image_bytes(
+    character: status_model.Character,
+    gen_type: int,
+    profile: EncodeProfile,
+    wait: bool = False,
+) -> bytes:
+    """キャラクターのビルド画像を、生成済みのものがあればそれを、なければ生成して返却します。
+
+    Args:
+        character (status_model.Character): キャラクターデータ
+        gen_type (int): 0: GenshinStatus, 1: Artifacter
+        profile (EncodeProfile): エンコード設定
+        wait (bool, optional): Trueの場合、ワーカープールが混み合っていても503にせず空きを待ちます. Defaults to False.
+
+    Returns:
+        bytes: 画像のbytes
+    """
+    ext = image_encoder.get_extension(profile, image_encoder.JPEG)
+    file_path = character_file_path(character, gen_type, profile, ext)
+    return await image_cache_service.get_image_bytes(
+        file_path, lambda: render_service.render_character(gen_type, character, profile, wait=wait))
+
+
+async def iter_user_character_images(
+    user_data: status_model.UserData,
+    gen_type: int,
+    profile: EncodeProfile,
+    build_type: Optional[str] = None,
+    max_in_flight: int = MAX_IN_FLIGHT,
+) -> AsyncIterator[tuple[str, bytes]]:
+    """ユーザーデータのすべてのキャラクターのビルド画像を並列に生成し、完了した順に返却します。
+    生成中と返却待ちの画像はmax_in_flight枚までとし、返却した分だけ次の生成を開始します。
+    そのため、キャラクター数や受け取り側の速度に関わらず、保持する画像の枚数は一定です。
+
+    Args:
+        user_data (status_model.UserData): ユーザーデータ
+        gen_type (int): 0: GenshinStatus, 1: Artifacter
+        profile (EncodeProfile): エンコード設定
+        build_type (Optional[str], optional): build_typeが指定されていないキャラクターに利用するビルドのタイプ. Defaults to None.
+        max_in_flight (int, optional): 同時に保持する画像の枚数. Defaults to MAX_IN_FLIGHT.
+
+    Raises:
+        HTTPException: gen_typeが存在しない場合に404をraiseします
+
+    Yields:
+        tuple[str, bytes]: ファイル名と画像のbytes
+    """
+    check_gen_type(gen_type)
+    ext = image_encoder.get_extension(profile, image_encoder.JPEG)
+
+    async def render(character: status_model.Character) -> tuple[str, bytes]:
+        # 送信の開始後は503を返せないため、ワーカープールが混み合っている場合は空きを待ちます
+        while True:
+            try:
+                image_bytes = await get_character_image_bytes(character, gen_type, profile, wait=True)
+                break
+            except HTTPException as e:
+                # 待機しない他のリクエストの生成を共有し、その生成が503になった場合はやり直します
+                if e.status_code != 503:
+                    raise
+        return character_filename(character, gen_type, ext), image_bytes
+
+    for character in user_data.characters:
+        if character.build_type is None:
+            character.build_type = build_type or DEFAULT_BUILD_TYPE
+
+    characters = iter(user_data.characters)
+    pending: set[asyncio.Task] = set()
+    try:
+        while True:
+            while len(pending) < max_in_flight:
+                character = next(characters, None)
+                if character is None:
+                    break
+                pending.add(asyncio.create_task(render(character)))
+            if not pending:
+                break
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        # 途中で失敗した場合や切断された場合は残りの生成を取り消します
+        for task in pending:
+            task.cancel()
@@ -1,23 +1,33 @@
 from io import BytesIO
 from lib.gen_image import GImage, Colors, Algin, Anchors, ImageAnchors
-from concurrent.futures import ThreadPoolExecutor, Future
+from concurrent.futures import Future
+from lib.sublayer_executor import SUBLAYER_EXECUTOR
 import model.status_model as status_model
 import model.util_model as util_model
 from PIL import Image, ImageFilter, ImageDraw
 from repository.assets_repository import ASSETS
 from decimal import Decimal
-import lib.cache_image as cache_image
+import lib.image_encoder as image_encoder
+import lib.metrics as metrics
+from lib.image_encoder import EncodeProfile, PROFILES
+import repository.util_repository as util_repository
+from lib.layer_cache import LayerCache
+import os
 
+BACKGROUND_CACHE = LayerCache("genshin_status_background")
+STATUS_LABEL_CACHE = LayerCache("genshin_status_label")
 
-def __create_background(element: str, gacha_icon: str, position: util_model.Position) -> GImage:
+
+def __build_background(element: str, gacha_icon: str, position: util_model.Position) -> Image.Image:
     """キャラ画像を合成したバックグラウンドを生成します。
 
     Args:
         element (str): 属性の名前
-        charaname (str): キャラの名前
+        gacha_icon (str): キャラ画像のパス
+        position (util_model.Position): キャラ画像の位置と倍率
 
     Returns:
-        GImage: 合成した画像
+        Image.Image: 合成した画像
     """
     # 元素別の画像
     img = GImage(
@@ -41,9 +51,44 @@ def __create_background(element: str, gacha_icon: str, position: util_model.Posi
     # オーバーレイ画像
     img.add_image(image_path=ASSETS.genshin_status.background_base)
 
-    return img
+    return img.get_image()
+
+
+@metrics.timed(metrics.RENDER_STAGE_SECONDS, "genshin", "background")
+def __create_background(element: str, gacha_icon: str, position: util_model.Position) -> GImage:
+    """キャラ画像を合成したバックグラウンドを取得します。
+    入力が同じであれば同じ画像になるため、合成済みの画像をキャッシュして利用します。
+
+    Args:
+        element (str): 属性の名前
+        gacha_icon (str): キャラ画像のパス
+        position (util_model.Position): キャラ画像の位置と倍率
+
+    Returns:
+        GImage: 合成した画像
+    """
+    key = (element, gacha_icon, position.x, position.y, position.scale)
+    bg = BACKGROUND_CACHE.get_or_build(
+        key,
+        lambda: __build_background(element, gacha_icon, position),
+    )
+    return GImage(image=bg, default_font_size=26)
+
 
+def prewarm_background_cache():
+    """すべてのキャラクターとコスチュームのバックグラウンドを事前に生成してキャッシュします。
+    属性が未収録のものとキャラ画像がダウンロードされていないものはスキップします。
+    """
+    for character in util_repository.CHARACTER_DATA_DICT.values():
+        if character.element not in ASSETS.genshin_status.background_elements:
+            continue
+        for costume in character.costumes.values():
+            if not os.path.exists(costume.gacha_icon.path):
+                continue
+            __create_background(character.element, costume.gacha_icon.path, costume.position)
 
+
+@metrics.timed(metrics.RENDER_STAGE_SECONDS, "genshin", "star_and_lv")
 def __create_star_and_lv(quantity: int, lv: int, constellations: str) -> Image.Image:
     """★とレベル、凸のイメージを作成します
 
@@ -80,20 +125,10 @@ def __create_star_and_lv(quantity: int, lv: int, constellations: str) -> Image.I
     return img.get_image()
 
 
-def __create_status_add(base: int, add: int, type: str, path: str) -> Image.Image:
-    """キャラクターの個別のステータスの画像を取得します。これはHPなど合成数が利用されるもの専用です。
-
-    Args:
-        base (int): ベースの数値
-        add (int): 装備の数値
-
-    Returns:
-        Image: キャラクターの個別のステータスの画像
-    """
-
+def __build_status_label(type: str, path: str, font_size: int) -> Image.Image:
     img = GImage(
         box_size=(600, 100),
-        default_font_size=22,
+        default_font_size=font_size,
     )
 
     img.add_image(
@@ -108,6 +143,41 @@ def __create_status_add(base: int, add: int, type: str, path: str) -> Image.Imag
         position=(86, 50),
         anchor=Anchors.LEFT_MIDDLE,
     )
+
+    return img.get_image()
+
+
+def __create_status_label(type: str, path: str, font_size: int = 22) -> GImage:
+    """ステータスのアイコンと名前のみを合成した画像を取得します。数値はこの画像に描画します。
+
+    Args:
+        type (str): ステータス名
+        path (str): ステータスのアイコンのパス
+        font_size (int, optional): ステータス名のフォントサイズ. Defaults to 22.
+
+    Returns:
+        GImage: アイコンと名前を合成した画像のコピー
+    """
+    label = STATUS_LABEL_CACHE.get_or_build(
+        (type, path, font_size),
+        lambda: __build_status_label(type, path, font_size),
+    )
+    return GImage(image=label, default_font_size=font_size)
+
+
+def __create_status_add(base: int, add: int, type: str, path: str) -> Image.Image:
+    """キャラクターの個別のステータスの画像を取得します。これはHPなど合成数が利用されるもの専用です。
+
+    Args:
+        base (int): ベースの数値
+        add (int): 装備の数値
+
+    Returns:
+        Image: キャラクターの個別のステータスの画像
+    """
+
+    img = __create_status_label(type, path)
+
     # ベース値の合成
     img.draw_text(
         text=str(base),
@@ -145,23 +215,8 @@ def __create_status(status: Decimal, type: str, path: str, suffix="%") -> Image.
     Returns:
         Image.Image: キャラクターの個別のステータス画像
     """
-    img = GImage(
-        box_size=(600, 100),
-        default_font_size=22,
-    )
+    img = __create_status_label(type, path)
 
-    img.add_image(
-        image_path=path,
-        box=(50, 50),
-        size=(45, 45),
-        image_anchor=ImageAnchors.MIDDLE_MIDDLE
-    )
-
-    img.draw_text(
-        text=type,
-        position=(86, 50),
-        anchor=Anchors.LEFT_MIDDLE,
-    )
     # ステータスの合成
     img.draw_text(
         text=f"{status}{suffix}",
@@ -173,6 +228,7 @@ def __create_status(status: Decimal, type: str, path: str, suffix="%") -> Image.
     return img.get_image()
 
 
+@metrics.timed(metrics.RENDER_STAGE_SECONDS, "genshin", "status")
 def __create_full_status(
     hp_base: int,
     hp_add: int,
@@ -213,7 +269,7 @@ def __create_full_status(
         default_font_size=24,
     )
     futures: list[Future] = []
-    with ThreadPoolExecutor(max_workers=20, thread_name_prefix="__create_status") as pool:
+    with SUBLAYER_EXECUTOR.scope() as pool:
         # HP
         futures.append(
             pool.submit(
@@ -357,6 +413,7 @@ def __create_skill(skill: status_model.Skill, element_color: tuple[int, int, int
     return img.get_image()
 
 
+@metrics.timed(metrics.RENDER_STAGE_SECONDS, "genshin", "skill")
 def __create_skill_list(skills: list[status_model.Skill], element_color: tuple[int, int, int]) -> Image.Image:
     """すべての天賦スキルをまとめた画像を生成します
 
@@ -372,7 +429,7 @@ def __create_skill_list(skills: list[status_model.Skill], element_color: tuple[i
         box_size=(600, 1000),
     )
     futures: list[Future] = []
-    with ThreadPoolExecutor(max_workers=20, thread_name_prefix="__create_skill") as pool:
+    with SUBLAYER_EXECUTOR.scope() as pool:
         # 各スキル画像の生成
         for i, skill in enumerate(skills):
             futures.append(
@@ -480,6 +537,7 @@ def __create_artifact(artifact: status_model.Artifact, angle: int, element_color
     return base_img.get_image()
 
 
+@metrics.timed(metrics.RENDER_STAGE_SECONDS, "genshin", "artifact_list")
 def __create_artifact_list(artifact_map: dict[status_model.Artifact], element_color: tuple[int, int, int]) -> Image.Image:
     """聖遺物の一覧の画像を生成します。
 
@@ -496,7 +554,7 @@ def __create_artifact_list(artifact_map: dict[status_model.Artifact], element_co
 
     futures: list[Future] = []
     # 各聖遺物のステータス画像の生成
-    with ThreadPoolExecutor(max_workers=20, thread_name_prefix="__create_artifact") as pool:
+    with SUBLAYER_EXECUTOR.scope() as pool:
         for i, v in enumerate(['EQUIP_BRACER', 'EQUIP_NECKLACE', 'EQUIP_SHOES', 'EQUIP_RING', 'EQUIP_DRESS']):
             futures.append(
                 pool.submit(
@@ -514,6 +572,7 @@ def __create_artifact_list(artifact_map: dict[status_model.Artifact], element_co
     return img.get_image()
 
 
+@metrics.timed(metrics.RENDER_STAGE_SECONDS, "genshin", "total_score")
 def __create_total_socre(artifact_list: dict[str, status_model.Artifact], element_color: tuple[int, int, int, int], build_type: str) -> Image.Image:
     """聖遺物のトータルスコアの画像を生成します
 
@@ -553,6 +612,7 @@ def __create_total_socre(artifact_list: dict[str, status_model.Artifact], elemen
     return img
 
 
+@metrics.timed(metrics.RENDER_STAGE_SECONDS, "genshin", "weapon")
 def __create_weapon(weapon: status_model.Weapon, element_color: tuple[int, int, int]) -> Image.Image:
     """武器画像を生成します
 
@@ -605,6 +665,7 @@ def __create_weapon(weapon: status_model.Weapon, element_color: tuple[int, int,
     return img.get_image()
 
 
+@metrics.timed(metrics.RENDER_STAGE_SECONDS, "genshin", "total")
 def __create_image(character: status_model.Character) -> Image.Image:
     """キャラデータから画像を生成します。
 
@@ -628,7 +689,7 @@ def __create_image(character: status_model.Character) -> Image.Image:
     weapon = character.weapon
     element_color = ELEMENT_COLOR[character.util.element]
 
-    with ThreadPoolExecutor(thread_name_prefix="__create") as pool:
+    with SUBLAYER_EXECUTOR.scope() as pool:
         # 背景画像の取得
         bgf: Future = pool.submit(
             __create_background,
@@ -727,31 +788,32 @@ def __create_image(character: status_model.Character) -> Image.Image:
     return bg.get_image()
 
 
-def get_character_image_bytes(character_status: status_model.Character) -> bytes:
-    """キャラクターステータスのオブジェクトからDiscord FileとPathを生成します。
+def get_character_image(character_status: status_model.Character) -> Image.Image:
+    """キャラクターステータスのオブジェクトから、エンコード前の画像を生成します。
 
     Args:
         character_status (CharacterStatus): キャラクター情報の入ったオブジェクト
 
     Returns:
-        bytes: Discord FileとPathの入ったTuple型
+        Image.Image: RGBの画像
     """
 
+    character_status.init_utils()
+    character_status.init_score()
     image = __create_image(character_status)
-    image.show()
-    fileio = BytesIO()
-    image = image.convert("RGB")
-    image.save(fileio, format="JPEG", optimize=True, quality=100)
-    return fileio.getvalue()
+    return image.convert("RGB")
 
 
-def save_image(file_path: str, character_status: status_model.Character):
-    if cache_image.check_cache_exists(file_path=file_path):
-        return
+def get_character_image_bytes(character_status: status_model.Character, profile: EncodeProfile = PROFILES["original"]) -> bytes:
+    """キャラクターステータスのオブジェクトから画像を生成し、エンコードしたbytesを返却します。
 
-    character_status.init_utils()
-    character_status.init_score()
-    image = __create_image(character=character_status)
-    image = image.convert("RGB")
-    image.save(file_path, optimize=True, quality=100)
-    cache_image.cache_append(file_path=file_path)
+    Args:
+        character_status (CharacterStatus): キャラクター情報の入ったオブジェクト
+        profile (EncodeProfile, optional): エンコード設定. Defaults to original.
+
+    Returns:
+        bytes: 画像のbytes
+    """
+
+    image = get_character_image(character_status)
+    return image_encoder.encode(image, profile, image_encoder.JPEG)
@@ -1,18 +1,26 @@
 from io import BytesIO
 from lib.gen_image import GImage, Colors, Algin, Anchors, ImageAnchors
-from concurrent.futures import ThreadPoolExecutor, Future
+from concurrent.futures import Future
+from lib.sublayer_executor import SUBLAYER_EXECUTOR
 import os
 import model.status_model as status_model
 import model.util_model as util_model
 from PIL import Image, ImageFilter, ImageDraw, ImageEnhance
 from repository.assets_repository import ASSETS
 from decimal import Decimal
-import lib.cache_image as cache_image
+import lib.image_encoder as image_encoder
+import lib.metrics as metrics
+from lib.image_encoder import EncodeProfile, PROFILES
+import lib.asset_cache as asset_cache
+import repository.util_repository as util_repository
+from lib.layer_cache import LayerCache
 from collections import Counter
 
 cwd = os.path.abspath(os.path.dirname(__file__))
 
 BASE_SIZE = (1920, 1080)
+# ステータスの1行分の画像のサイズ。数値は右端が612付近になるよう描画されます
+STATUS_ROW_SIZE = (640, 100)
 TALENT_BASE_SIZE = (int(149/1.5), int(137/1.5))
 IGNORE_PATTERN = set(['FIGHT_PROP_HP', 'FIGHT_PROP_ATTACK', 'FIGHT_PROP_DEFENSE'])
 
@@ -27,6 +35,9 @@ CONSTELLATIONBACKS = {
     ) for k, v in ASSETS.artifacter.constellations.items()
 }
 
+BACKGROUND_CACHE = LayerCache("artifacter_background")
+STATUS_LABEL_CACHE = LayerCache("artifacter_status_label")
+
 ARTIFACTER_REFER = {
     "TOTAL": [220, 200, 180],
     "EQUIP_BRACER": [50, 45, 40],
@@ -36,20 +47,37 @@ ARTIFACTER_REFER = {
     "EQUIP_DRESS": [40, 35, 30]
 }
 
-def __create_background(character: status_model.Character):
+def __get_mask_path(character: util_model.JpCharacterModel) -> str:
+    """キャラ画像を切り抜くマスクのパスを返却します
+
+    Args:
+        character (util_model.JpCharacterModel): キャラクターの情報
+
+    Returns:
+        str: マスク画像のパス
+    """
+    # 偉大なるアルハイゼン様専用処理
+    if character.english_name == 'Alhaitham':
+        return ASSETS.artifacter.mask.alhaithem
+    return ASSETS.artifacter.mask.character_mask
+
+
+def __build_background(element: str, gacha_icon: str, mask_path: str) -> Image.Image:
     """キャラ画像を合成したバックグラウンドを生成します。
 
     Args:
-        character (status_model.Character): キャラデータ
+        element (str): 属性の名前
+        gacha_icon (str): キャラ画像のパス
+        mask_path (str): キャラ画像を切り抜くマスクのパス
 
     Returns:
-        GImage: 合成した画像
+        Image.Image: 合成した画像
     """
     # 元素別の画像
     bg = GImage(
-        ASSETS.artifacter.background[character.util.element]).get_image()
-    chara_img = GImage(character.costume.gacha_icon.path).get_image()
-    shadow = Image.open(ASSETS.artifacter.shadow).resize(bg.size)
+        ASSETS.artifacter.background[element]).get_image()
+    chara_img = asset_cache.open_image(gacha_icon)
+    shadow = asset_cache.open_image(ASSETS.artifacter.shadow, size=bg.size, mode=None)
     chara_img = chara_img.crop(((chara_img.width - 1439) // 2, (chara_img.height - 1024) // 2, (chara_img.width + 1439) // 2, (chara_img.height + 1024) // 2))
     chara_img = chara_img.resize(
         (
@@ -58,13 +86,8 @@ def __create_background(character: status_model.Character):
         )
     )
     chara_mask = chara_img.copy()
-    # 偉大なるアルハイゼン様専用処理
-    if character.util.english_name == 'Alhaitham':
-        mask_path = ASSETS.artifacter.mask.alhaithem
-    else:
-        mask_path = ASSETS.artifacter.mask.character_mask
 
-    avater_mask = Image.open(mask_path).convert('L').resize(chara_img.size)
+    avater_mask = asset_cache.open_image(mask_path, size=chara_img.size, mode='L')
     chara_img.putalpha(avater_mask)
 
     chara_paste = Image.new("RGBA", BASE_SIZE, (255, 255, 255, 0))
@@ -78,7 +101,47 @@ def __create_background(character: status_model.Character):
     gimage_bg = GImage(box_size=BASE_SIZE)
     gimage_bg.paste(im=bg)
 
-    return gimage_bg
+    return gimage_bg.get_image()
+
+
+def __get_background(element: str, gacha_icon: str, mask_path: str) -> Image.Image:
+    return BACKGROUND_CACHE.get_or_build(
+        (element, gacha_icon, mask_path),
+        lambda: __build_background(element, gacha_icon, mask_path),
+    )
+
+
+@metrics.timed(metrics.RENDER_STAGE_SECONDS, "artifacter", "background")
+def __create_background(character: status_model.Character):
+    """キャラ画像を合成したバックグラウンドを取得します。
+    属性、キャラ画像、マスクが同じであれば同じ画像になるため、合成済みの画像をキャッシュして利用します。
+
+    Args:
+        character (status_model.Character): キャラデータ
+
+    Returns:
+        GImage: 合成した画像
+    """
+    bg = __get_background(
+        character.util.element,
+        character.costume.gacha_icon.path,
+        __get_mask_path(character.util),
+    )
+    return GImage(image=bg)
+
+
+def prewarm_background_cache():
+    """すべてのキャラクターとコスチュームのバックグラウンドを事前に生成してキャッシュします。
+    属性が未収録のものとキャラ画像がダウンロードされていないものはスキップします。
+    """
+    for character in util_repository.CHARACTER_DATA_DICT.values():
+        if character.element not in ASSETS.artifacter.background:
+            continue
+        mask_path = __get_mask_path(character)
+        for costume in character.costumes.values():
+            if not os.path.exists(costume.gacha_icon.path):
+                continue
+            __get_background(character.element, costume.gacha_icon.path, mask_path)
 
 
 def __create_weapon_img(weapon: status_model.Weapon, img_size: tuple[int, int]):
@@ -89,21 +152,12 @@ def __create_weapon_img(weapon: status_model.Weapon, img_size: tuple[int, int]):
         img_size (tuple[int, int]): weapon画像のサイズ
 
     Returns:
-        Image.Image: 武器画像
+        GImage: 武器画像のレイヤー
     """
-    weapon_img = Image.open(weapon.util.icon.path).convert(
-        "RGBA").resize((128, 128))
-    weapon_paste = Image.new("RGBA", img_size, (255, 255, 255, 0))
-
-    mask = weapon_img.copy()
-    weapon_paste.paste(weapon_img, mask=mask)
-    bg = Image.new("RGBA", BASE_SIZE)
-    bg.paste(im=weapon_paste, box=(1430, 50))
+    bg = GImage(box_size=img_size, offset=(1430, 50))
+    bg.add_image(image_path=weapon.util.icon.path, box=(1430, 50), size=img_size)
 
-    bg = GImage(box_size=BASE_SIZE)
-    bg.add_image(image_path=weapon.util.icon.path, box=(1430, 50), size=(128, 128))
-
-    return bg.get_image()
+    return bg
 
 
 def __gen_weapon_reality(weapon: status_model.Weapon):
@@ -113,16 +167,17 @@ def __gen_weapon_reality(weapon: status_model.Weapon):
         weapon (status_model.Weapon): weaponオブジェクト
 
     Returns:
-        Image.Image: 武器レアリティ画像
+        GImage: 武器レアリティ画像のレイヤー
     """
-    img = Image.open(ASSETS.artifacter.reality[weapon.rarity]).convert("RGBA")
-    img = img.resize(
-        (int(img.width*0.97), int(img.height*0.97))
+    reality_path = ASSETS.artifacter.reality[weapon.rarity]
+    img = asset_cache.open_image(reality_path)
+    img = asset_cache.open_image(
+        reality_path,
+        size=(int(img.width*0.97), int(img.height*0.97))
     )
-    paste = Image.new("RGBA", BASE_SIZE, (255, 255, 255, 0))
-    mask = img.copy()
+    paste = GImage(box_size=img.size, offset=(1422, 173))
 
-    paste.paste(img, (1422, 173), mask=mask)
+    paste.get_image().paste(img, (0, 0), mask=img)
     return paste
 
 def __gen_weapon_status_icon(image_path:str, xy: tuple[int, int]):
@@ -132,12 +187,11 @@ def __gen_weapon_status_icon(image_path:str, xy: tuple[int, int]):
         weapon (status_model.Weapon): weaponオブジェクト
 
     Returns:
-        Image.Image: 武器レアリティ画像
+        GImage: 武器のステータスのアイコンのレイヤー
     """
-    Base = Image.new("RGBA", BASE_SIZE, (255, 255, 255, 0))
-    BaseAtk = Image.open(image_path).resize((23, 23))
-    BaseAtkmask = BaseAtk.copy()
-    Base.paste(BaseAtk, xy, mask=BaseAtkmask)
+    BaseAtk = asset_cache.open_image(image_path, size=(23, 23), mode=None)
+    Base = GImage(box_size=BaseAtk.size, offset=xy)
+    Base.get_image().paste(BaseAtk, (0, 0), mask=BaseAtk)
     return Base
 
 def __gen_talent_img(talent_path: str):
@@ -151,7 +205,7 @@ def __gen_talent_img(talent_path: str):
     """
     paste = Image.new("RGBA", TALENT_BASE_SIZE, (255, 255, 255, 0))
     paste = Image.alpha_composite(paste, TALENT_BASE)
-    talent = Image.open(talent_path).resize((50, 50)).convert('RGBA')
+    talent = asset_cache.open_image(talent_path, size=(50, 50), resize_first=True)
     mask = talent.copy()
     paste.paste(
         talent,
@@ -169,20 +223,18 @@ def __gen_artifact_image(artifact: status_model.Artifact):
     Returns:
         Image.Image: 聖遺物の画像
     """
-    bg = Image.new('RGBA', BASE_SIZE, (255, 255, 255, 0))
-    artifact_image = Image.open(artifact.util.icon.path).resize((333, 333))
-    artifact_image = artifact_image.convert("RGBA")
+    artifact_image = asset_cache.open_image(artifact.util.icon.path, size=(333, 333), resize_first=True)
     artifact_image_enchance = ImageEnhance.Brightness(artifact_image)
     artifact_image = artifact_image_enchance.enhance(0.6)
     artifact_image_copy = artifact_image.copy()
+    bg = Image.new('RGBA', artifact_image.size, (255, 255, 255, 0))
 
-    artifact_image_mask = Image.open(ASSETS.artifacter.mask.artifact_mask).convert('L').resize((333, 333))
+    artifact_image_mask = asset_cache.open_image(ASSETS.artifacter.mask.artifact_mask, size=(333, 333), mode='L')
     artifact_image.putalpha(artifact_image_mask)
     bg.paste(artifact_image, mask=artifact_image_copy)
-    Base = Image.new('RGBA', BASE_SIZE, (255, 255, 255, 0))
-    Base = Image.alpha_composite(Base, bg)
     return bg
 
+@metrics.timed(metrics.RENDER_STAGE_SECONDS, "artifacter", "talent")
 def __gen_talent_list_img(character: status_model.Character):
     """単体の天賦アイコン画像をリスト状にした画像を生成します
 
@@ -190,17 +242,20 @@ def __gen_talent_list_img(character: status_model.Character):
         character (status_model.Character): キャラクターデータ
 
     Returns:
-        Image.Image: リスト状の天賦アイコン画像
+        GImage: リスト状の天賦アイコン画像のレイヤー
     """
-    paste = Image.new("RGBA", BASE_SIZE, (255, 255, 255, 0))
-    with ThreadPoolExecutor(thread_name_prefix="talents") as executor:
+    with SUBLAYER_EXECUTOR.scope() as executor:
         talents = [
             executor.submit(__gen_talent_img, v.util.icon.path) for v in
             character.skills
         ]
+    paste = GImage(
+        box_size=(TALENT_BASE_SIZE[0], (max(len(talents), 1)-1)*105+TALENT_BASE_SIZE[1]),
+        offset=(15, 330),
+    )
     for i, v in enumerate(talents):
         talent = v.result()
-        paste.paste(talent, (15, 330+i*105))
+        paste.get_image().paste(talent, (0, i*105))
     return paste
 
 
@@ -214,8 +269,7 @@ def __gen_constellation_img(constellation_icon_path: str, constellation_base: Im
     Returns:
         Image.Image: 単体の命の星座画像
     """
-    chara_constellation = Image.open(constellation_icon_path).convert(
-        "RGBA").resize((45, 45))
+    chara_constellation = asset_cache.open_image(constellation_icon_path, size=(45, 45))
     chara_constellation_paste = Image.new("RGBA", constellation_base.size, (255, 255, 255, 0))
     chara_constellation_mask = chara_constellation.copy()
     chara_constellation_paste.paste(chara_constellation, (int(chara_constellation_paste.width/2)-25,
@@ -231,21 +285,28 @@ def __gen_constellation_list_img(character: status_model.Character):
         character (status_model.Character): キャラクターデータ
 
     Returns:
-        Image.Image: リスト状の星座画像
+        GImage: リスト状の星座画像のレイヤー
     """
-    constellation_paste = Image.new("RGBA", BASE_SIZE, (255, 255, 255, 0))
     constellation_lock, constellation_base = CONSTELLATIONBACKS[character.util.element]
     clock_mask = constellation_lock.copy()
-    with ThreadPoolExecutor(thread_name_prefix="constellations") as executor:
+    with SUBLAYER_EXECUTOR.scope() as executor:
         constellation_objects = [
             executor.submit(__gen_constellation_img, v.path, constellation_base) for v in character.constellation_list
         ]
+    layer = GImage(
+        box_size=(
+            max(constellation_lock.width, constellation_base.width),
+            5*93 + max(constellation_lock.height, constellation_base.height),
+        ),
+        offset=(666, 83),
+    )
+    constellation_paste = layer.get_image()
     for i in range(6):
         if len(constellation_objects) > i:
-            constellation_paste.paste(constellation_objects[i].result(), (666, 83+i*93))
+            constellation_paste.paste(constellation_objects[i].result(), (0, i*93))
         else:
-            constellation_paste.paste(constellation_lock, (666, 83+i*93), mask=clock_mask)
-    return constellation_paste
+            constellation_paste.paste(constellation_lock, (0, i*93), mask=clock_mask)
+    return layer
 
 
 def __get_rounded_rectangle(xy: tuple[tuple[int, int], tuple[int, int]]):
@@ -255,44 +316,88 @@ def __get_rounded_rectangle(xy: tuple[tuple[int, int], tuple[int, int]]):
         xy (tuple[tuple[int, int], tuple[int, int]]): 座標
 
     Returns:
-        Image.Image: なんかよく見る角丸の黒い背景画像
+        GImage: なんかよく見る角丸の黒い背景画像のレイヤー
     """
-    # image以外のオブジェクト読み込んでるので変更したほうがいいかも・・・
-    img = GImage(box_size=BASE_SIZE).get_image()
-    draw = ImageDraw.Draw(img)
-    draw.rounded_rectangle(xy=xy,  radius=2, fill="black")
-    return img
-
-def __create_status_add(base: int, add: int, type: str = None, path: str = None) -> Image.Image:
-    """キャラクターの個別のステータスの画像を取得します。これはHPなど合成数が利用されるもの専用です。
-
-    Args:
-        base (int): ベースの数値
-        add (int): 装備の数値
-
-    Returns:
-        Image: キャラクターの個別のステータスの画像
-    """
-
+    (x0, y0), (x1, y1) = xy
+    # 角丸の範囲だけのレイヤーにします。端の1pxは余白です
+    layer = GImage(box_size=(x1 - x0 + 3, y1 - y0 + 3), offset=(x0 - 1, y0 - 1))
+    draw = ImageDraw.Draw(layer.get_image())
+    draw.rounded_rectangle(xy=((1, 1), (x1 - x0 + 1, y1 - y0 + 1)),  radius=2, fill="black")
+    return layer
+
+def __build_status_label(
+    type: str,
+    path: str,
+    font_size: int,
+    icon_box: tuple[int, int],
+    icon_size: tuple[int, int],
+    text_position: tuple[int, int],
+) -> Image.Image:
     img = GImage(
-        box_size=(1200, 100),
-        default_font_size=22,
+        box_size=STATUS_ROW_SIZE,
+        default_font_size=font_size,
     )
 
+    # ステータスのアイコン
     if path:
         img.add_image(
             image_path=path,
-            box=(50, 50),
-            size=(45, 45),
+            box=icon_box,
+            size=icon_size,
             image_anchor=ImageAnchors.MIDDLE_MIDDLE
         )
+    # ステータス名
     if type:
         img.draw_text(
             text=type,
-            position=(86, 50),
+            position=text_position,
             anchor=Anchors.LEFT_MIDDLE,
         )
 
+    return img.get_image()
+
+
+def __create_status_label(
+    type: str,
+    path: str,
+    font_size: int,
+    icon_box: tuple[int, int],
+    icon_size: tuple[int, int],
+    text_position: tuple[int, int],
+) -> GImage:
+    """ステータスのアイコンと名前のみを合成した画像を取得します。数値はこの画像に描画します。
+
+    Args:
+        type (str): ステータス名。Noneの場合は描画しません
+        path (str): ステータスのアイコンのパス。Noneの場合は描画しません
+        font_size (int): ステータス名のフォントサイズ
+        icon_box (tuple[int, int]): アイコンの中心の位置
+        icon_size (tuple[int, int]): アイコンのサイズ
+        text_position (tuple[int, int]): ステータス名の位置
+
+    Returns:
+        GImage: アイコンと名前を合成した画像のコピー
+    """
+    label = STATUS_LABEL_CACHE.get_or_build(
+        (type, path, font_size, icon_box, icon_size, text_position),
+        lambda: __build_status_label(type, path, font_size, icon_box, icon_size, text_position),
+    )
+    return GImage(image=label, default_font_size=font_size)
+
+
+def __create_status_add(base: int, add: int, type: str = None, path: str = None) -> Image.Image:
+    """キャラクターの個別のステータスの画像を取得します。これはHPなど合成数が利用されるもの専用です。
+
+    Args:
+        base (int): ベースの数値
+        add (int): 装備の数値
+
+    Returns:
+        Image: キャラクターの個別のステータスの画像
+    """
+
+    img = __create_status_label(type, path, 22, (50, 50), (45, 45), (86, 50))
+
     add_text_size = img.get_textsize(text=f"+ {add}", font_size=18)
     # ベース値の合成
     img.draw_text(
@@ -330,26 +435,8 @@ def __create_status(status: Decimal, type: str = None, path: str = None, suffix=
     Returns:
         Image.Image: キャラクターの個別のステータス画像
     """
-    img = GImage(
-        box_size=(1200, 100),
-        default_font_size=26,
-    )
+    img = __create_status_label(type, path, 26, (55, 50), (40, 40), (95, 50))
 
-    # ステータスのアイコン
-    if path:
-        img.add_image(
-            image_path=path,
-            box=(55, 50),
-            size=(40, 40),
-            image_anchor=ImageAnchors.MIDDLE_MIDDLE
-        )
-    # ステータス名
-    if type:
-        img.draw_text(
-            text=type,
-            position=(95, 50),
-            anchor=Anchors.LEFT_MIDDLE,
-        )
     # ステータスの合成
     img.draw_text(
         text = status,
@@ -367,14 +454,10 @@ def __create_full_status(character: status_model.Character):
         character (status_model.Character): キャラクターデータ
 
     Returns:
-        Image.Image: ステータス部分の画像
+        GImage: ステータス部分の画像のレイヤー
     """
-    img = GImage(
-        box_size=BASE_SIZE,
-        default_font_size=25,
-    )
     futures: list[Future] = []
-    with ThreadPoolExecutor(max_workers=20, thread_name_prefix="__create_status") as pool:
+    with SUBLAYER_EXECUTOR.scope() as pool:
         # HP
         futures.append(
             pool.submit(
@@ -440,13 +523,19 @@ def __create_full_status(character: status_model.Character):
                 )
             )
 
+    img = GImage(
+        box_size=(STATUS_ROW_SIZE[0], (len(futures)-1)*70+STATUS_ROW_SIZE[1]),
+        default_font_size=25,
+        offset=(750, 30),
+    )
     for i, f in enumerate(futures):
         im: Image = f.result()
         # 各画像を合成します
         img.paste(im=im, box=(750, 30+i*70))
 
-    return img.get_image()
+    return img
 
+@metrics.timed(metrics.RENDER_STAGE_SECONDS, "artifacter", "character_status")
 def __create_full_character_status(character: status_model.Character):
     """完全なキャラクターの画像を生成します
 
@@ -454,10 +543,11 @@ def __create_full_character_status(character: status_model.Character):
         character (status_model.Character): キャラクターデータ
 
     Returns:
-        Image.Image: 完全なキャラクターの画像
+        GImage: 完全なキャラクターの画像のレイヤー
     """
+    # 名前や天賦レベルからステータス部分の右端までのレイヤーです
     base = GImage(
-        box_size=BASE_SIZE,
+        box_size=(1400, 760),
         default_font_size=25,
     )
     base.draw_text(position=(30, 20), text=character.util.name, font_size=48)
@@ -498,20 +588,22 @@ def __create_full_character_status(character: status_model.Character):
         )
     )
 
-    return base.get_image()
+    return base
 
-def __create_weapon(weapon: status_model.Weapon) -> Image.Image:
+@metrics.timed(metrics.RENDER_STAGE_SECONDS, "artifacter", "weapon")
+def __create_weapon(weapon: status_model.Weapon) -> GImage:
     """武器画像を生成します
 
     Args:
         weapon (weapon): weaponオブジェクト
 
     Returns:
-        Image.Image: 武器画像
+        GImage: 武器画像のレイヤー
     """
     img = GImage(
-        box_size=BASE_SIZE,
+        box_size=(BASE_SIZE[0]-1400, 260),
         default_font_size=45,
+        offset=(1400, 0),
     )
     # 武器画像を合成
     img.paste(
@@ -579,7 +671,7 @@ def __create_weapon(weapon: status_model.Weapon) -> Image.Image:
         font_size=24, 
         )
 
-    return img.get_image()
+    return img
 
 def __create_artifact(artifact: status_model.Artifact) -> Image.Image:
     """個別の聖遺物の画像を生成します。
@@ -698,7 +790,8 @@ def __create_artifact(artifact: status_model.Artifact) -> Image.Image:
 
     return base_img.get_image()
 
-def __create_total_socre(artifact_list: dict[str, status_model.Artifact], build_type: str) -> Image.Image:
+@metrics.timed(metrics.RENDER_STAGE_SECONDS, "artifacter", "total_score")
+def __create_total_socre(artifact_list: dict[str, status_model.Artifact], build_type: str) -> GImage:
     """聖遺物のトータルスコアの画像を生成します
 
     Args:
@@ -706,10 +799,10 @@ def __create_total_socre(artifact_list: dict[str, status_model.Artifact], build_
         element_color (tuple[int, int, int]): 元素属性のカラー
 
     Returns:
-        Image.Image: 聖遺物のトータルスコア画像
+        GImage: 聖遺物のトータルスコア画像のレイヤー
     """
     total_score = round(sum([v.score for v in artifact_list.values()]), 1)
-    img = GImage(box_size=BASE_SIZE, default_font_size=40)
+    img = GImage(box_size=(BASE_SIZE[0]-1400, 400), default_font_size=40, offset=(1400, 300))
     # スコア合計
     img.draw_text(
         position=(1652, 420), 
@@ -726,15 +819,16 @@ def __create_total_socre(artifact_list: dict[str, status_model.Artifact], build_
     )
 
     if total_score >= 220:
-        ScoreEv = Image.open(ASSETS.artifacter.artifact_grades[3])
+        score_ev_path = ASSETS.artifacter.artifact_grades[3]
     elif total_score >= 200:
-        ScoreEv = Image.open(ASSETS.artifacter.artifact_grades[2])
+        score_ev_path = ASSETS.artifacter.artifact_grades[2]
     elif total_score >= 180:
-        ScoreEv = Image.open(ASSETS.artifacter.artifact_grades[1])
+        score_ev_path = ASSETS.artifacter.artifact_grades[1]
     else:
-        ScoreEv = Image.open(ASSETS.artifacter.artifact_grades[0])
+        score_ev_path = ASSETS.artifacter.artifact_grades[0]
 
-    ScoreEv = ScoreEv.resize((ScoreEv.width//8, ScoreEv.height//8))
+    ScoreEv = asset_cache.open_image(score_ev_path, mode=None)
+    ScoreEv = asset_cache.open_image(score_ev_path, size=(ScoreEv.width//8, ScoreEv.height//8), mode=None)
     EvMask = ScoreEv.copy()
 
     # 本家ではこのペースト時にEvMaskでマスクしてる。GImageにマスクないねん。
@@ -742,7 +836,8 @@ def __create_total_socre(artifact_list: dict[str, status_model.Artifact], build_
 
     return img
 
-def __create_artifact_list(artifact_map: dict[status_model.Artifact]) -> Image.Image:
+@metrics.timed(metrics.RENDER_STAGE_SECONDS, "artifacter", "artifact_list")
+def __create_artifact_list(artifact_map: dict[status_model.Artifact]) -> GImage:
     """聖遺物の一覧の画像を生成します。
 
     Args:
@@ -750,15 +845,16 @@ def __create_artifact_list(artifact_map: dict[status_model.Artifact]) -> Image.I
         element_color (tuple[int, int, int]): 元素属性のカラー
 
     Returns:
-        Image.Image: 聖遺物一覧画像
+        GImage: 聖遺物一覧画像のレイヤー
     """
     img = GImage(
-        box_size=BASE_SIZE,
+        box_size=(373*4+360, 415),
+        offset=(30, 648),
     )
 
     futures: list[Future] = []
     # 各聖遺物のステータス画像の生成
-    with ThreadPoolExecutor(max_workers=20, thread_name_prefix="__create_artifact") as pool:
+    with SUBLAYER_EXECUTOR.scope() as pool:
         for i, v in enumerate(['EQUIP_BRACER', 'EQUIP_NECKLACE', 'EQUIP_SHOES', 'EQUIP_RING', 'EQUIP_DRESS']):
             try:
                 futures.append(
@@ -773,19 +869,21 @@ def __create_artifact_list(artifact_map: dict[status_model.Artifact]) -> Image.I
     for i, v in enumerate(futures):
         im: Image = v.result()
         img.paste(im=im, box=(373*i+30, 648))
-    return img.get_image()
+    return img
 
-def __create_artifact_set(character: status_model.Character) -> Image.Image:
+@metrics.timed(metrics.RENDER_STAGE_SECONDS, "artifacter", "artifact_set")
+def __create_artifact_set(character: status_model.Character) -> GImage:
     """聖遺物のセット名を表示する画像を生成します。
 
     Args:
         character (Character): キャラデータ
 
     Returns:
-        Image.Image: 聖遺物のセット名画像
+        GImage: 聖遺物のセット名画像のレイヤー
     """
     img = GImage(
-        box_size=BASE_SIZE,
+        box_size=(BASE_SIZE[0]-1500, 110),
+        offset=(1500, 230),
     )
     set_name = []
     for v in ['EQUIP_BRACER', 'EQUIP_NECKLACE', 'EQUIP_SHOES', 'EQUIP_RING', 'EQUIP_DRESS']:
@@ -793,12 +891,13 @@ def __create_artifact_set(character: status_model.Character) -> Image.Image:
             set_name.append(character.artifacts[v].util.set_name)
         except KeyError:
             continue
-    count_dict = {item: set_name.count(item) for item in set(set_name)}
+    # setの順序は実行ごとに変わるため、2セットが2つの場合の表示順が変わらないよう装備部位の順にします
+    count_dict = {item: set_name.count(item) for item in dict.fromkeys(set_name)}
     counts = count_dict.values()
     try:
         max(counts)
     except ValueError:
-        return img.get_image()
+        return img
     if 2 <= max(counts) <= 3:
         text=[k for k, v in count_dict.items() if v >= 2]
         try:
@@ -820,8 +919,9 @@ def __create_artifact_set(character: status_model.Character) -> Image.Image:
             font_size=28 - len(''.join([k for k, v in count_dict.items() if v >= 4])+'(4)') + 9,
             font_color=Colors.GENSHIN_GREEN)
     
-    return img.get_image()
+    return img
 
+@metrics.timed(metrics.RENDER_STAGE_SECONDS, "artifacter", "total")
 def __create_image(character: status_model.Character) -> Image.Image:
     """キャラデータから画像を生成します。
 
@@ -835,7 +935,7 @@ def __create_image(character: status_model.Character) -> Image.Image:
     artifacts = character.artifacts
     weapon = character.weapon
 
-    with ThreadPoolExecutor(thread_name_prefix="__create") as pool:
+    with SUBLAYER_EXECUTOR.scope() as pool:
         # 背景画像の取得
         bgf: Future = pool.submit(
             __create_background,
@@ -902,14 +1002,32 @@ def __create_image(character: status_model.Character) -> Image.Image:
         im=artifactsetf)
     return bg.get_image()
 
-def save_image(file_path: str, character_status: status_model.Character):
-    # if cache_image.check_cache_exists(file_path=file_path):
-        # return
+def get_character_image(character_status: status_model.Character) -> Image.Image:
+    """キャラクターステータスのオブジェクトから、エンコード前の画像を生成します。
+
+    Args:
+        character_status (CharacterStatus): キャラクター情報の入ったオブジェクト
+
+    Returns:
+        Image.Image: RGBの画像
+    """
 
     character_status.init_utils()
     character_status.init_score()
     image = __create_image(character=character_status)
-    image = image.convert("RGB")
-    image.save(file_path, optimize=True, quality=100)
-    cache_image.cache_append(file_path=file_path)
+    return image.convert("RGB")
+
+
+def get_character_image_bytes(character_status: status_model.Character, profile: EncodeProfile = PROFILES["original"]) -> bytes:
+    """キャラクターステータスのオブジェクトから画像を生成し、エンコードしたbytesを返却します。
+
+    Args:
+        character_status (CharacterStatus): キャラクター情報の入ったオブジェクト
+        profile (EncodeProfile, optional): エンコード設定. Defaults to original.
+
+    Returns:
+        bytes: 画像のbytes
+    """
 
+    image = get_character_image(character_status)
+    return image_encoder.encode(image, profile, image_encoder.JPEG)
@@ -0,0 +1,93 @@
+from lib.redis_render_cache import REDIS_RENDER_CACHE
+from lib.single_flight import SingleFlight
+import lib.request_profiler as request_profiler
+from typing import Awaitable, Callable, Optional
+import lib.cache_image as cache_image
+import lib.metrics as metrics
+import aiofiles
+import aiofiles.os
+import asyncio
+import os
+
+# 書き込み中のファイルと、そのタスクです。タスクが破棄されないよう参照を保持します
+__pending_writes: dict[str, asyncio.Task] = {}
+# 同じ画像への同時のリクエストは、1回の読み込みまたは生成の結果を共有します
+RENDER_FLIGHT = SingleFlight("render")
+
+
+@metrics.timed(metrics.OPERATION_SECONDS, "disk_write")
+async def __write_behind(file_path: str, image_bytes: bytes):
+    # 書き込み途中のファイルを読まないように一時ファイルから置き換えます
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
+    try:
+        async with aiofiles.open(tmp_path, mode="wb") as f:
+            await f.write(image_bytes)
+        await aiofiles.os.replace(tmp_path, file_path)
+        cache_image.cache_append(file_path=file_path)
+    except OSError as e:
+        print(f"write behind error: {file_path} {e}")
+    finally:
+        __pending_writes.pop(file_path, None)
+
+
+def save_bytes_later(file_path: str, image_bytes: bytes):
+    """画像をバックグラウンドでディスクに保存します。RENDER_CACHE_PERSISTが"0"の場合は保存しません。
+
+    Args:
+        file_path (str): 画像の保存先
+        image_bytes (bytes): 画像のbytes
+    """
+    if not cache_image.PERSIST or file_path in __pending_writes:
+        return
+    __pending_writes[file_path] = asyncio.create_task(
+        __write_behind(file_path, image_bytes)
+    )
+
+
+async def __read_bytes(file_path: str) -> Optional[bytes]:
+    if not cache_image.PERSIST or not cache_image.check_cache_exists(file_path=file_path):
+        return None
+    try:
+        async with aiofiles.open(file_path, mode="rb") as f:
+            return await f.read()
+    except OSError:
+        return None
+
+
+async def __load_or_render(file_path: str, render: Callable[[], Awaitable[bytes]]) -> bytes:
+    image_bytes = await __read_bytes(file_path)
+    persisted = image_bytes is not None
+    if image_bytes is None and REDIS_RENDER_CACHE is not None:
+        image_bytes = await REDIS_RENDER_CACHE.get(os.path.basename(file_path))
+    if image_bytes is None:
+        image_bytes = await render()
+        if REDIS_RENDER_CACHE is not None:
+            await REDIS_RENDER_CACHE.put(os.path.basename(file_path), image_bytes)
+
+    cache_image.put_bytes(file_path, image_bytes)
+    if not persisted:
+        save_bytes_later(file_path, image_bytes)
+    return image_bytes
+
+
+async def get_image_bytes(file_path: str, render: Callable[[], Awaitable[bytes]]) -> bytes:
+    """生成済みの画像をメモリ、ディスク、Redisの順に探し、存在しない場合は生成します。
+    生成した画像はメモリに保持し、ディスクにはバックグラウンドで保存します。
+    同じ画像の読み込みや生成が実行中の場合は、新たに実行せずその結果を待ちます。
+    プロファイル中のリクエストは、キャッシュを使わずに生成します。
+
+    Args:
+        file_path (str): 画像の保存先。キャッシュのキーとしても利用します
+        render (Callable[[], Awaitable[bytes]]): 画像を生成する関数
+
+    Returns:
+        bytes: 画像のbytes
+    """
+    if request_profiler.ACTIVE.get():
+        return await render()
+
+    image_bytes = cache_image.get_bytes(file_path)
+    if image_bytes is not None:
+        return image_bytes
+
+    return await RENDER_FLIGHT.do(file_path, lambda: __load_or_render(file_path, render))
@@ -0,0 +1,132 @@
+from fastapi import HTTPException
+from lib.render_pool import RenderPool
+from lib.image_encoder import EncodeProfile
+import lib.gen_image as gen_image
+import lib.layer_cache as layer_cache
+import lib.asset_cache as asset_cache
+import model.status_model as status_model
+import model.ranking_model as ranking_model
+import repository.util_repository as util_repository
+import service.gen_genshin_image as gen_genshin_image
+import service.gen_genshin_image_by_artifacter as gen_artifacter_image
+import service.gen_profile_image as gen_profile_image
+import service.gen_ranking_user_image as gen_ranking_user_image
+import multiprocessing
+
+CHARACTER_GENERATORS = {
+    0: gen_genshin_image,
+    1: gen_artifacter_image,
+}
+
+# 生成処理で利用するフォントサイズ。ワーカーの起動時に読み込んでおきます
+PRELOAD_FONT_SIZES = [
+    10, 12, 13, 15, 16, 17, 18, 20, 21, 22, 23, 24, 25,
+    26, 27, 29, 30, 36, 40, 45, 48, 49, 54, 75, 86,
+]
+
+# 親プロセスでdataのjsonが更新されるたびに加算し、ワーカーはこれを見て再読み込みします
+DATA_VERSION = multiprocessing.get_context("spawn").Value("i", 0)
+
+__worker_data_version = None
+__loaded_data_version = 0
+
+
+def init_worker(data_version):
+    """プロセスワーカーの起動時に実行します。
+    このモジュールのimportでアセットやキャラクターデータが読み込まれるため、ここではフォントを読み込みます。
+
+    Args:
+        data_version (multiprocessing.Value): 親プロセスのDATA_VERSION
+    """
+    global __worker_data_version, __loaded_data_version
+    __worker_data_version = data_version
+    __loaded_data_version = data_version.value
+    for size in PRELOAD_FONT_SIZES:
+        gen_image.get_font("./font/ja-jp.ttf", size)
+
+
+def __reload_if_updated():
+    """親プロセスでデータが更新されていた場合、キャラクターデータなどを読み込み直します。
+    スレッドで実行している場合は親プロセスと同じデータを参照しているため何もしません。
+    """
+    global __loaded_data_version
+    if __worker_data_version is None:
+        return
+    version = __worker_data_version.value
+    if version == __loaded_data_version:
+        return
+    util_repository.static_init()
+    asset_cache.clear()
+    layer_cache.clear_all()
+    __loaded_data_version = version
+
+
+def notify_data_update():
+    """dataのjsonが更新されたことをプロセスワーカーに通知します。
+    """
+    with DATA_VERSION.get_lock():
+        DATA_VERSION.value += 1
+
+
+def __create_character_bytes(gen_type: int, character: status_model.Character, profile: EncodeProfile) -> bytes:
+    __reload_if_updated()
+    return CHARACTER_GENERATORS[gen_type].get_character_image_bytes(character, profile)
+
+
+def __create_profile_bytes(userdata: status_model.UserData, profile: EncodeProfile) -> bytes:
+    __reload_if_updated()
+    return gen_profile_image.get_profile_image_bytes(userdata, profile)
+
+
+def __create_ranking_bytes(ranking_data: ranking_model.RankingData, profile: EncodeProfile) -> bytes:
+    __reload_if_updated()
+    return gen_ranking_user_image.get_character_image_bytes(ranking_data, profile)
+
+
+RENDER_POOL = RenderPool(initializer=init_worker, initargs=(DATA_VERSION,))
+
+
+async def render_character(gen_type: int, character: status_model.Character, profile: EncodeProfile, wait: bool = False) -> bytes:
+    """キャラクターのビルド画像をワーカープールで生成します。
+
+    Args:
+        gen_type (int): 0: GenshinStatus, 1: Artifacter
+        character (status_model.Character): キャラクターデータ
+        profile (EncodeProfile): エンコード設定
+        wait (bool, optional): Trueの場合、ワーカープールが混み合っていても503にせず空きを待ちます. Defaults to False.
+
+    Raises:
+        HTTPException: gen_typeが存在しない場合に404をraiseします
+
+    Returns:
+        bytes: 画像のbytes
+    """
+    if gen_type not in CHARACTER_GENERATORS:
+        raise HTTPException(status_code=404, detail=f"gen_type {gen_type} is not found.")
+    return await RENDER_POOL.run(__create_character_bytes, gen_type, character, profile, wait=wait)
+
+
+async def render_profile(userdata: status_model.UserData, profile: EncodeProfile) -> bytes:
+    """プロフィール画像をワーカープールで生成します。
+
+    Args:
+        userdata (status_model.UserData): ユーザーデータ
+        profile (EncodeProfile): エンコード設定
+
+    Returns:
+        bytes: 画像のbytes
+    """
+    return await RENDER_POOL.run(__create_profile_bytes, userdata, profile)
+
+
+async def render_ranking(ranking_data: ranking_model.RankingData, profile: EncodeProfile) -> bytes:
+    """ランキング画像をワーカープールで生成します。
+
+    Args:
+        ranking_data (ranking_model.RankingData): ランキングデータ
+        profile (EncodeProfile): エンコード設定
+
+    Returns:
+        bytes: 画像のbytes
+    """
+    return await RENDER_POOL.run(__create_ranking_bytes, ranking_data, profile)
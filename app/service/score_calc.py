@@ -1,4 +1,6 @@
 from decimal import Decimal
+from math import lcm
+from typing import Iterable, Optional
 
 
 ATK = "atk"
@@ -74,6 +76,104 @@ SCORE_FORMULA_DICT = {
 }
 
 
+BUILD_TYPES = tuple(SCORE_FORMULA_DICT.keys())
+
+# 係数を整数にするための共通の分母です。Decimal(0.9)などfloatから生成した係数も含め、誤差なく整数で表せます
+WEIGHT_DENOMINATOR = lcm(*[
+    weight.as_integer_ratio()[1]
+    for formula in SCORE_FORMULA_DICT.values()
+    for weight in formula.values()
+])
+# 整数のスコアは、スコア * SCORE_SCALEの値です
+SCORE_SCALE = 10 * WEIGHT_DENOMINATOR
+
+def __to_weight(weight: Decimal) -> int:
+    numerator, denominator = weight.as_integer_ratio()
+    return numerator * (WEIGHT_DENOMINATOR // denominator)
+
+
+# ステータスごとの、BUILD_TYPESの順の整数の係数です。値を0.1単位の整数にしたものに掛けるとスコアになります
+WEIGHT_TABLE: dict[str, tuple[int, ...]] = {
+    status_type: tuple(
+        __to_weight(SCORE_FORMULA_DICT[build_type].get(status_type, Decimal(0)))
+        for build_type in BUILD_TYPES
+    )
+    for status_type in {k for formula in SCORE_FORMULA_DICT.values() for k in formula}
+}
+
+
+# 係数が0でないビルドタイプの番号と係数です
+__NONZERO_WEIGHTS: dict[str, tuple[tuple[int, int], ...]] = {
+    status_type: tuple((i, weight) for i, weight in enumerate(weights) if weight)
+    for status_type, weights in WEIGHT_TABLE.items()
+}
+
+
+def __to_tenths(value: Decimal) -> Optional[int]:
+    numerator, denominator = Decimal(value).scaleb(1).as_integer_ratio()
+    if denominator != 1:
+        return None
+    return numerator
+
+
+def calc_artifact_scores(artifacts: Iterable) -> Optional[dict[str, list[int]]]:
+    """聖遺物一式のスコアを、すべてのビルドタイプについて1回の走査で計算します。
+    スコアはSCORE_SCALE倍した整数で、ScoreCalcで計算した値と表示上の差はありません。
+
+    Args:
+        artifacts (Iterable): statusにname, valueを持つ聖遺物
+
+    Returns:
+        Optional[dict[str, list[int]]]: ビルドタイプごとの、聖遺物の順のスコア。
+            値が0.1単位でない場合やサブステータスがない聖遺物がある場合はNone
+    """
+    result = {build_type: [] for build_type in BUILD_TYPES}
+    lists = list(result.values())
+    for artifact in artifacts:
+        if not artifact.status:
+            return None
+        scores = [0] * len(BUILD_TYPES)
+        for status in artifact.status:
+            weights = __NONZERO_WEIGHTS.get(status.name)
+            if weights is None:
+                continue
+            tenths = __to_tenths(status.value)
+            if tenths is None:
+                return None
+            for i, weight in weights:
+                scores[i] += tenths * weight
+        for score_list, score in zip(lists, scores):
+            score_list.append(score)
+    return result
+
+
+def to_decimal(score: int) -> Decimal:
+    """calc_artifact_scoresのスコアをDecimalに変換します
+
+    Args:
+        score (int): SCORE_SCALE倍したスコア
+
+    Returns:
+        Decimal: スコア
+    """
+    return Decimal(score) / SCORE_SCALE
+
+
+def to_tenths(score: int) -> int:
+    """calc_artifact_scoresのスコアを、round(スコア, 1)と同じく偶数丸めで0.1単位の整数にします
+
+    Args:
+        score (int): SCORE_SCALE倍したスコア
+
+    Returns:
+        int: スコアを10倍した整数
+    """
+    tenths, remainder = divmod(score, WEIGHT_DENOMINATOR)
+    if remainder * 2 > WEIGHT_DENOMINATOR or (remainder * 2 == WEIGHT_DENOMINATOR and tenths % 2 == 1):
+        tenths += 1
+    return tenths
+
+
 class ScoreCalc:
     def __init__(self, build_type: str):
         _build_type = {}
@@ -87,6 +187,50 @@ class ScoreCalc:
             result = self.build_type[status_type] * Decimal(value)
         return result
 
+
+def calc_build_scores(artifacts: Iterable) -> dict[str, Decimal]:
+    """聖遺物一式の合計スコアを、すべてのビルドタイプについて計算します。
+    値は画像に表示される合計スコアと同じく、小数点以下1桁に丸めます。
+
+    Args:
+        artifacts (Iterable): statusにname, valueを持つ聖遺物
+
+    Returns:
+        dict[str, Decimal]: ビルドタイプと合計スコア
+    """
+    artifacts = list(artifacts)
+    scores = calc_artifact_scores(artifacts)
+    if scores is not None:
+        return {
+            build_type: Decimal(to_tenths(sum(artifact_scores))).scaleb(-1)
+            for build_type, artifact_scores in scores.items()
+        }
+
+    result = {}
+    for build_type in BUILD_TYPES:
+        calc = ScoreCalc(build_type)
+        total = sum([
+            sum([calc.calc(status.name, status.value) for status in artifact.status])
+            for artifact in artifacts
+        ])
+        result[build_type] = round(Decimal(total), 1)
+    return result
+
+
+def recommend_build_type(build_scores: dict[str, Decimal]) -> Optional[str]:
+    """合計スコアが最も高いビルドタイプを返却します。同じ場合はBUILD_TYPESの順で先のものを返却します
+
+    Args:
+        build_scores (dict[str, Decimal]): calc_build_scoresの戻り値
+
+    Returns:
+        Optional[str]: ビルドタイプ。すべて0の場合はNone
+    """
+    build_type = max(BUILD_TYPES, key=lambda k: build_scores[k])
+    if build_scores[build_type] <= 0:
+        return None
+    return build_type
+
 # 元素チャージ → Ch: 1, 率: 2, ダメ: 1
 # 防御 →  防御率: 1, 率: 2, ダメ: 1
 # HP型 → HP: 1, 率:2, ダメ: 1
@@ -4,16 +4,13 @@ import datetime
 import model.status_model as status_model
 import model.enka_model as enka_model
 import repository.enka_repository as enka_repository
-from repository.util_repository import CHARACTER_DATA_DICT
-import redis
-import json
+import repository.util_repository as util_repository
+from fastapi import HTTPException
+from lib.single_flight import SingleFlight
+from lib.redis_status_cache import STATUS_CACHE
 
-
-TTL = 600
-
-
-pool = redis.ConnectionPool(host="redis")
-redis_obj = redis.StrictRedis(connection_pool=pool)
+# 同じUIDへの同時のリクエストは、1回のenkaへのリクエストの結果を共有します
+ENKA_FLIGHT = SingleFlight("enka")
 
 PERCENT_PATTERN = re.compile(
     r"PERCENT|CRITICAL|FIGHT_PROP_CHARGE_EFFICIENCY|_ADD_HURT"
@@ -70,7 +67,7 @@ def get_characters(
     # 新バージョンで追加されデータ未収録のIDは除外する
     characters = [
         get_character_status(uid, create_date, v) for v in avatar_info_list
-        if resolve_character_id(v) in CHARACTER_DATA_DICT
+        if resolve_character_id(v) in util_repository.CHARACTER_DATA_DICT
     ]
     return characters
 
@@ -142,7 +139,7 @@ def get_skills(id: str, skill_levels: dict[str, int], extra_skill_levels: dict[s
         status_model.Skill(
             level=skill_levels[v.id],
             add_level=extra_skill_levels[v.proud_id] if v.proud_id in extra_skill_levels else 0,
-        )for v in CHARACTER_DATA_DICT[id].skills
+        )for v in util_repository.CHARACTER_DATA_DICT[id].skills
     ]
 
 
@@ -157,7 +154,7 @@ def get_elemental_name_value(id: str, avatar_info: enka_model.AvatarInfo):
         if max_value < avatar_info.fightPropMap[k]:
             max_value = avatar_info.fightPropMap[k]
             max_key = k
-    character_element = CHARACTER_DATA_DICT[id].element
+    character_element = util_repository.CHARACTER_DATA_DICT[id].element
     if max_key is not None:
         if max_value == avatar_info.fightPropMap[ELEMENT_MAP[character_element]]:
             elemental_name = character_element
@@ -170,7 +167,7 @@ def get_elemental_name_value(id: str, avatar_info: enka_model.AvatarInfo):
 
 def get_character_status(uid: int, create_date: str, avatar_info: enka_model.AvatarInfo):
     id = resolve_character_id(avatar_info)
-    star = CHARACTER_DATA_DICT[id].quality
+    star = util_repository.CHARACTER_DATA_DICT[id].quality
     constellations = len(avatar_info.talentIdList)
     level = int(avatar_info.propMap["4001"].val)
     base_hp = int(avatar_info.fightPropMap["1"])
@@ -194,7 +191,7 @@ def get_character_status(uid: int, create_date: str, avatar_info: enka_model.Ava
     )
     artifacts = get_artifacts(avatar_info.equipList[:-1])
     weapon = get_weapon(avatar_info.equipList[-1])
-    return status_model.Character(
+    character = status_model.Character(
         id=id,
         star=star,
         constellations=constellations,
@@ -219,18 +216,44 @@ def get_character_status(uid: int, create_date: str, avatar_info: enka_model.Ava
         create_date=create_date,
         costume_id=avatar_info.costumeId
     )
+    character.init_build_scores()
+    return character
 
 
 async def get_user_data(uid) -> status_model.UserData:
-    if redis_obj.keys(uid):
-        return status_model.UserData(** json.loads(redis_obj.get(uid)))
+    """UIDのユーザーデータを取得します。取得済みの場合はRedisに保存したものを返却します。
+    enkaが4xxを返した場合はその結果も短時間保存し、同じエラーをraiseします。
+
+    Args:
+        uid (int): UID
+
+    Raises:
+        HTTPException: enkaからの取得に失敗した場合にraiseします
 
-    enka = await enka_repository.get_enka_model(uid)
+    Returns:
+        status_model.UserData: ユーザーデータ
+    """
+    data = await STATUS_CACHE.get(uid)
+    if data is not None:
+        if "error" in data:
+            raise HTTPException(**data["error"])
+        return status_model.UserData(**data)
+
+    return await ENKA_FLIGHT.do(uid, lambda: __fetch_user_data(uid))
+
+
+async def __fetch_user_data(uid) -> status_model.UserData:
+    try:
+        enka = await enka_repository.get_enka_model(uid)
+    except HTTPException as e:
+        if e.status_code in enka_repository.CLIENT_ERROR_STATUS_CODES:
+            await STATUS_CACHE.put_error(uid, e.status_code, e.detail)
+        raise
     create_date = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
     char_name_map = {
-        CHARACTER_DATA_DICT[c.avatarId].name: i
+        util_repository.CHARACTER_DATA_DICT[c.avatarId].name: i
         for i, c in enumerate(enka.playerInfo.showAvatarInfoList)
-        if c.avatarId in CHARACTER_DATA_DICT
+        if c.avatarId in util_repository.CHARACTER_DATA_DICT
     }
     char_list = get_characters(enka.uid, create_date, enka.avatarInfoList)
 
@@ -253,6 +276,6 @@ async def get_user_data(uid) -> status_model.UserData:
             costume_id=enka.playerInfo.profilePicture.costumeId
         )
     )
-    redis_obj.set(uid, user_data.json())
-    redis_obj.expire(uid, TTL)
+    # enkaの次の更新までは同じデータが返却されるため、少なくともその秒数は保持します
+    await STATUS_CACHE.put(uid, user_data.json(), enka.ttl)
     return user_data
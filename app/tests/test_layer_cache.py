@@ -0,0 +1,61 @@
+"""LayerCacheのメモリ上の上限が、すべてのインスタンスの合計に適用されることを確認します。
+"""
+import os
+import sys
+
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lib.layer_cache as layer_cache  # noqa: E402
+from lib.asset_cache import image_bytes  # noqa: E402
+from lib.lru_cache import LRUCache  # noqa: E402
+
+# 100x100のRGBAは40000バイトです
+LAYER_BYTES = 40000
+
+
+@pytest.fixture
+def shared_cache(monkeypatch):
+    cache = LRUCache(max_weight=LAYER_BYTES * 2, weigher=image_bytes)
+    monkeypatch.setattr(layer_cache, "SHARED_CACHE", cache)
+    monkeypatch.setattr(layer_cache, "LAYER_CACHES", {})
+    return cache
+
+
+def __build():
+    return Image.new("RGBA", (100, 100))
+
+
+def test_budget_is_shared_between_caches(shared_cache):
+    a = layer_cache.LayerCache("a", persist_dir=None)
+    b = layer_cache.LayerCache("b", persist_dir=None)
+
+    a.get_or_build(1, __build)
+    b.get_or_build(1, __build)
+    a.get_or_build(2, __build)
+
+    # 3枚目で合計が上限を超えるため、最も古いaの1が破棄されます
+    assert shared_cache.weight == LAYER_BYTES * 2
+    stats = layer_cache.stats()
+    assert stats["a"]["entries"] == 1
+    assert stats["b"]["entries"] == 1
+    assert stats["a"]["max_weight"] == stats["b"]["max_weight"] == layer_cache.MAX_CACHE_BYTES
+
+    a.get_or_build(2, __build)
+    assert a.stats()["hits"] == 1
+    assert a.stats()["misses"] == 2
+
+
+def test_clear_only_removes_own_layers(shared_cache):
+    a = layer_cache.LayerCache("a", persist_dir=None)
+    b = layer_cache.LayerCache("b", persist_dir=None)
+    a.get_or_build(1, __build)
+    b.get_or_build(1, __build)
+
+    b.clear()
+
+    assert a.stats()["entries"] == 1
+    assert b.stats()["entries"] == 0
+    assert shared_cache.weight == LAYER_BYTES
@@ -0,0 +1,127 @@
+"""RedisRenderCacheをfakeredisのクライアントで確認します。
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.redis_render_cache import RedisRenderCache  # noqa: E402
+import lib.cache_image as cache_image  # noqa: E402
+import service.image_cache_service as image_cache_service  # noqa: E402
+
+
+def __client(connected: bool = True):
+    # テストごとに別のサーバーを使い、データが共有されないようにします
+    server = fakeredis.FakeServer()
+    server.connected = connected
+    return fakeredis.aioredis.FakeRedis(server=server)
+
+
+def test_put_and_get():
+    async def run():
+        cache = RedisRenderCache(__client(), ttl=60, max_bytes=1024)
+        assert await cache.get("a.png") is None
+        await cache.put("a.png", b"image-a")
+        assert await cache.get("a.png") == b"image-a"
+
+        stats = await cache.stats()
+        assert (stats["hits"], stats["misses"], stats["errors"]) == (1, 1, 0)
+        assert stats["weight"] == len(b"image-a")
+        assert 0 < await cache.client.ttl(cache.prefix + "a.png") <= 60
+
+    asyncio.run(run())
+
+
+def test_overwrite_keeps_total_size():
+    async def run():
+        cache = RedisRenderCache(__client(), max_bytes=1024)
+        await cache.put("a.png", b"x" * 100)
+        await cache.put("a.png", b"x" * 40)
+        assert int(await cache.client.get(cache.total_key)) == 40
+        assert int(await cache.client.hget(cache.sizes_key, "a.png")) == 40
+
+    asyncio.run(run())
+
+
+def test_evicts_least_recently_used_by_size():
+    async def run():
+        cache = RedisRenderCache(__client(), max_bytes=250)
+        await cache.put("a.png", b"a" * 100)
+        await cache.put("b.png", b"b" * 100)
+        # aを参照して、bを最も参照されていない画像にします
+        assert await cache.get("a.png") is not None
+        await cache.put("c.png", b"c" * 100)
+
+        client = cache.client
+        assert await cache.get("b.png") is None
+        assert await cache.get("a.png") == b"a" * 100
+        assert await cache.get("c.png") == b"c" * 100
+        assert await client.zrange(cache.index_key, 0, -1) == [b"a.png", b"c.png"]
+        assert await client.hget(cache.sizes_key, "b.png") is None
+        assert int(await client.get(cache.total_key)) == 200
+        assert cache.evictions == 1
+
+    asyncio.run(run())
+
+
+def test_skips_image_larger_than_limit():
+    async def run():
+        cache = RedisRenderCache(__client(), max_bytes=10)
+        await cache.put("a.png", b"x" * 11)
+        assert await cache.get("a.png") is None
+        assert await cache.client.get(cache.total_key) is None
+
+    asyncio.run(run())
+
+
+def test_expired_image_is_a_miss():
+    async def run():
+        cache = RedisRenderCache(__client(), ttl=60, max_bytes=1024)
+        await cache.put("a.png", b"image-a")
+        # TTLが経過した状態にします
+        await cache.client.pexpire(cache.prefix + "a.png", 1)
+        await asyncio.sleep(0.01)
+
+        assert await cache.get("a.png") is None
+        assert cache.misses == 1
+
+    asyncio.run(run())
+
+
+def test_redis_errors_are_treated_as_miss():
+    async def run():
+        cache = RedisRenderCache(__client(connected=False))
+        await cache.put("a.png", b"image-a")
+        assert await cache.get("a.png") is None
+        stats = await cache.stats()
+        assert stats["errors"] == 2
+        assert stats["weight"] is None
+
+    asyncio.run(run())
+
+
+def test_falls_back_to_local_cache_when_redis_is_down(monkeypatch, tmp_path):
+    monkeypatch.setattr(cache_image, "PERSIST", False)
+    monkeypatch.setattr(image_cache_service, "REDIS_RENDER_CACHE", RedisRenderCache(__client(connected=False)))
+    file_path = str(tmp_path / "redis_down.png")
+    calls = []
+
+    async def render() -> bytes:
+        calls.append(1)
+        return b"rendered"
+
+    async def run():
+        first = await image_cache_service.get_image_bytes(file_path, render)
+        second = await image_cache_service.get_image_bytes(file_path, render)
+        return first, second
+
+    assert asyncio.run(run()) == (b"rendered", b"rendered")
+    # 2回目はメモリ上のキャッシュから返却されます
+    assert len(calls) == 1
+    assert cache_image.get_bytes(file_path) == b"rendered"
+    assert image_cache_service.REDIS_RENDER_CACHE.errors == 2
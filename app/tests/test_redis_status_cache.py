@@ -0,0 +1,78 @@
+"""RedisStatusCacheをfakeredisのクライアントで確認します。
+"""
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.redis_status_cache import RedisStatusCache  # noqa: E402
+
+UID = 800000000
+USER_DATA = {"uid": UID, "nickname": "traveler"}
+
+
+def __client(connected: bool = True):
+    # テストごとに別のサーバーを使い、データが共有されないようにします
+    server = fakeredis.FakeServer()
+    server.connected = connected
+    return fakeredis.aioredis.FakeRedis(server=server)
+
+
+def test_hit_returns_user_data():
+    async def run():
+        cache = RedisStatusCache(__client(), ttl=600, negative_ttl=60)
+        await cache.put(UID, json.dumps(USER_DATA), ttl=60)
+        assert await cache.get(UID) == USER_DATA
+        assert 0 < await cache.client.ttl(UID) <= 600
+
+    asyncio.run(run())
+
+
+def test_longer_enka_ttl_is_used():
+    async def run():
+        cache = RedisStatusCache(__client(), ttl=600, negative_ttl=60)
+        await cache.put(UID, json.dumps(USER_DATA), ttl=1200)
+        assert 600 < await cache.client.ttl(UID) <= 1200
+
+    asyncio.run(run())
+
+
+def test_miss_returns_none():
+    async def run():
+        cache = RedisStatusCache(__client())
+        assert await cache.get(UID) is None
+        assert cache.errors == 0
+
+    asyncio.run(run())
+
+
+def test_not_found_is_cached_with_negative_ttl():
+    async def run():
+        cache = RedisStatusCache(__client(), ttl=600, negative_ttl=60)
+        await cache.put_error(UID, 404, "uid not found")
+        assert await cache.get(UID) == {"error": {"status_code": 404, "detail": "uid not found"}}
+        assert 0 < await cache.client.ttl(UID) <= 60
+
+        # 保持する秒数が過ぎた後は再度enkaから取得します
+        await cache.client.pexpire(UID, 1)
+        await asyncio.sleep(0.01)
+        assert await cache.get(UID) is None
+
+    asyncio.run(run())
+
+
+def test_redis_down_is_treated_as_miss():
+    async def run():
+        cache = RedisStatusCache(__client(connected=False))
+        await cache.put(UID, json.dumps(USER_DATA))
+        await cache.put_error(UID, 404, "uid not found")
+        assert await cache.get(UID) is None
+        assert cache.errors == 3
+
+    asyncio.run(run())
@@ -0,0 +1,120 @@
+"""4種類の画像生成の結果を、コミットされた正解画像のハッシュと比較します。
+enkaの画像の代わりにrender_benchmarkが生成する画像を利用するため、ネットワークやサーバーは不要です。
+
+正解は画素のsha256で、1画素でも異なる場合は失敗します。記録したフォントで生成した場合のみ比較します。
+描画を意図して変更した場合は、正解を更新してください。
+    UPDATE_GOLDEN=1 GOLDEN_FONT=/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf python -m pytest tests/test_render_golden.py
+更新時にはtests/golden/imagesに元の解像度の画像も保存します(コミットはしません)。
+手元で差分の大きさを確認する場合はGOLDEN_THRESHOLDを指定すると、その画像との差分の平均が閾値以下であれば成功とします。
+"""
+import hashlib
+import json
+import os
+import sys
+import tempfile
+
+import pytest
+from PIL import Image
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+import render_benchmark  # noqa: E402
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+# 生成元と入力の名前 -> 画素のsha256
+GOLDEN_DIGESTS = os.path.join(GOLDEN_DIR, "digests.json")
+# 正解を生成したフォントのsha256です
+GOLDEN_FONT_HASH = os.path.join(GOLDEN_DIR, "font.sha256")
+# 更新時に保存する元の解像度の画像です。GOLDEN_THRESHOLDを指定した場合の比較に利用します
+GOLDEN_IMAGE_DIR = os.path.join(GOLDEN_DIR, "images")
+# 手元で確認する場合のみ指定する、許容する差分(0-255の平均)。0の場合は完全に一致する必要があります
+THRESHOLD = float(os.getenv("GOLDEN_THRESHOLD", 0))
+UPDATE = os.getenv("UPDATE_GOLDEN") == "1"
+
+
+def __file_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def __read_golden_font_hash() -> str:
+    if not os.path.exists(GOLDEN_FONT_HASH):
+        return ""
+    with open(GOLDEN_FONT_HASH, "r", encoding="utf-8") as f:
+        return f.read().strip()
+
+
+def __read_digests() -> dict[str, str]:
+    if not os.path.exists(GOLDEN_DIGESTS):
+        return {}
+    with open(GOLDEN_DIGESTS, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def __write_digest(name: str, digest: str):
+    digests = __read_digests()
+    digests[name] = digest
+    os.makedirs(GOLDEN_DIR, exist_ok=True)
+    with open(GOLDEN_DIGESTS, "w", encoding="utf-8") as f:
+        json.dump(dict(sorted(digests.items())), f, indent=2)
+        f.write("\n")
+
+
+try:
+    FONT = render_benchmark.find_font(os.getenv("GOLDEN_FONT"))
+except FileNotFoundError as e:
+    pytest.skip(f"{e} (GOLDEN_FONT)", allow_module_level=True)
+FONT_HASH = __file_hash(FONT)
+# 代わりの画像の生成には時間がかかるため、フォントごとに作業ディレクトリを使い回します
+WORK_DIR = os.path.join(tempfile.gettempdir(), f"genshin_render_golden_{FONT_HASH[:12]}")
+
+
+def __build_cases() -> list[tuple[str, str, object]]:
+    render_benchmark.prepare_work_dir(WORK_DIR, FONT)
+    cwd = os.getcwd()
+    # 画像生成のモジュールはimport時に作業ディレクトリの画像を読み込みます
+    os.chdir(WORK_DIR)
+    try:
+        return render_benchmark.build_cases()
+    finally:
+        os.chdir(cwd)
+
+
+CASES = __build_cases()
+
+
+@pytest.mark.parametrize(
+    "generator,fixture,render",
+    CASES,
+    ids=[f"{generator}_{fixture}" for generator, fixture, _ in CASES],
+)
+def test_render_matches_golden(generator, fixture, render, monkeypatch):
+    name = f"{generator}_{fixture}"
+    if not UPDATE and FONT_HASH != __read_golden_font_hash():
+        pytest.skip(f"正解と異なるフォントです。正解を生成したフォントをGOLDEN_FONTで指定してください: {FONT}")
+
+    monkeypatch.chdir(WORK_DIR)
+    image = render()
+    digest = render_benchmark.pixel_digest(image)
+
+    if UPDATE:
+        __write_digest(name, digest)
+        os.makedirs(GOLDEN_IMAGE_DIR, exist_ok=True)
+        image.save(os.path.join(GOLDEN_IMAGE_DIR, f"{name}.png"), compress_level=1)
+        with open(GOLDEN_FONT_HASH, "w", encoding="utf-8") as f:
+            f.write(FONT_HASH + "\n")
+        return
+
+    expected = __read_digests().get(name)
+    assert expected is not None, f"正解がありません。UPDATE_GOLDEN=1で生成してください: {name}"
+    if digest == expected:
+        return
+
+    golden_path = os.path.join(GOLDEN_IMAGE_DIR, f"{name}.png")
+    if THRESHOLD > 0 and os.path.exists(golden_path):
+        with Image.open(golden_path) as golden:
+            mean, over = render_benchmark.perceptual_diff(image, golden)
+        assert mean <= THRESHOLD, f"差分の平均 {mean:.3f} / 16を超える値 {over:.2f}%"
+        return
+    pytest.fail(f"正解と画素が一致しません: {name}")
@@ -0,0 +1,95 @@
+"""SingleFlightが同じキーの処理を1回だけ実行し、呼び出し元のキャンセルの影響を受けないことを確認します。
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lib.single_flight as single_flight  # noqa: E402
+
+
+@pytest.fixture
+def flight(monkeypatch):
+    # テスト用のインスタンスを統計情報に登録しないようにします
+    monkeypatch.setattr(single_flight, "SINGLE_FLIGHTS", {})
+    return single_flight.SingleFlight("test")
+
+
+def test_concurrent_callers_share_one_call(flight):
+    calls = []
+
+    async def run():
+        release = asyncio.Event()
+
+        async def work():
+            calls.append(1)
+            await release.wait()
+            return "done"
+
+        waiters = [asyncio.ensure_future(flight.do("key", work)) for _ in range(5)]
+        await asyncio.sleep(0)
+        assert flight.stats() == {"calls": 1, "coalesced": 4, "in_flight": 1}
+        release.set()
+        return await asyncio.gather(*waiters)
+
+    assert asyncio.run(run()) == ["done"] * 5
+    assert len(calls) == 1
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_different_keys_run_separately(flight):
+    async def run():
+        async def work(value):
+            await asyncio.sleep(0)
+            return value
+
+        return await asyncio.gather(flight.do("a", lambda: work(1)), flight.do("b", lambda: work(2)))
+
+    assert asyncio.run(run()) == [1, 2]
+    assert flight.stats()["calls"] == 2
+
+
+def test_cancelled_caller_does_not_cancel_shared_task(flight):
+    calls = []
+
+    async def run():
+        release = asyncio.Event()
+
+        async def work():
+            calls.append(1)
+            await release.wait()
+            return "done"
+
+        first = asyncio.ensure_future(flight.do("key", work))
+        second = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0)
+
+        # 最初の呼び出し元が切断されても、共有している処理は継続します
+        first.cancel()
+        await asyncio.sleep(0)
+        assert first.cancelled()
+        assert flight.stats()["in_flight"] == 1
+
+        release.set()
+        return await second
+
+    assert asyncio.run(run()) == "done"
+    assert len(calls) == 1
+
+
+def test_exception_is_raised_to_every_caller(flight):
+    async def run():
+        async def work():
+            await asyncio.sleep(0)
+            raise ValueError("failed")
+
+        return await asyncio.gather(
+            flight.do("key", work), flight.do("key", work), return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+    assert [type(e) for e in results] == [ValueError, ValueError]
+    assert flight.stats() == {"calls": 1, "coalesced": 1, "in_flight": 0}
@@ -39,8 +39,8 @@ def gen_image_bench_test(gen_mode:str):
 
     json_data = json_data['characters'][0]
     image_list = []
-    filetime = str(time.time())
-    json_data['create_date'] = filetime
+    # create_dateは生成済み画像のキーに含まれないため、キーに含まれるuidを実行ごとに変えて生成済み画像に当たらないようにします
+    json_data['uid'] = int(time.time() * 1000)
 
     tyohukucheck = set()
     with ThreadPoolExecutor(thread_name_prefix="__create") as pool:
@@ -137,14 +137,54 @@ def gen_profile_test():
     else:
         print("No image data found in the response.")
 
+def gen_image_throughput_test(gen_mode: str, concurrency: int, total: int):
+    """同時にリクエストを送り、1秒あたりの生成枚数を計測します。
+    サーバーのRENDER_POOL_SIZEを変えて起動し直し、結果を比較してください。
+    """
+    endpoint_url = f"http://localhost/buildimage/genshinstat/{gen_mode}/"
 
+    with open('response_1687156408314.json', "r", encoding="utf-8") as json_file:
+        characters = json.load(json_file)['characters']
+
+    def post(i):
+        local_json = copy.deepcopy(characters[i % len(characters)])
+        local_json['build_type'] = 'atk'
+        # 生成済み画像に当たらないよう、キーに含まれるuidをリクエストごとに変えます
+        local_json['uid'] = run_id + i
+        return requests.post(endpoint_url, json=local_json).status_code
+
+    run_id = int(time.time() * 1000) * 1000
+    pool_stats = requests.get("http://localhost/util/cache-stats").json()["render_pool"]
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        status_codes = list(pool.map(post, range(total)))
+    elapsed = time.time() - start_time
+    success = status_codes.count(200)
+    print(f"pool: {pool_stats['type']} x {pool_stats['size']} / 同時接続数: {concurrency}")
+    print(f"成功: {success}/{total} / 処理時間: {elapsed:.2f}秒 / スループット: {success/elapsed:.2f}枚/秒")
+
+
+def gen_batch_test(gen_mode: str):
+    """ショーケースの全キャラクターを1回のリクエストでzipとして取得します。
+    """
+    endpoint_url = f"http://localhost/buildimage/genshinstat/{gen_mode}/batch/"
 
+    with open('response_1687156408314.json', "r", encoding="utf-8") as json_file:
+        json_data = json.load(json_file)
 
+    start_time = time.time()
+    response = requests.post(endpoint_url, json=json_data, params={"build_type": "atk"})
+    if not response:
+        print(f"batch error: {response.status_code}")
+        return
+    with open(f"./result/batch_{gen_mode}.zip", "wb") as f:
+        f.write(response.content)
+    print(f"{len(json_data['characters'])}キャラクター / 処理時間: {time.time() - start_time:.2f}秒")
 
 
 
 
-select = input("1:画像生成、2:uidデータ、3:プロフィール画像生成、4:全キャラクターベンチマーク、5:キャラクター名リスト出力")
+select = input("1:画像生成、2:uidデータ、3:プロフィール画像生成、4:全キャラクターベンチマーク、5:キャラクター名リスト出力、6:スループット計測、7:一括生成")
 
 if select=="1":
     print("画像生成開始")
@@ -184,4 +224,18 @@ elif select=="4":
     start = time.time()
     gen_image_bench_test("1")
     print(f"処理時間：{str(time.time() - start)}秒")
-    print("========《処理終了》========")
\ No newline at end of file
+    print("========《処理終了》========")
+
+elif select=="6":
+    concurrency = int(input("同時接続数: "))
+    total = int(input("リクエスト数: "))
+    print("========《GenshinStatus版スループット》========")
+    gen_image_throughput_test("0", concurrency, total)
+    print("========《Artifact版スループット》========")
+    gen_image_throughput_test("1", concurrency, total)
+
+elif select=="7":
+    print("========《GenshinStatus版一括生成》========")
+    gen_batch_test("0")
+    print("========《Artifact版一括生成》========")
+    gen_batch_test("1")